@@ -0,0 +1,79 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+from datetime import datetime
+from optparse import OptionParser
+from isolation import isolated
+from yamp import Pool, version
+
+
+def cmdArgs(parser):
+    '''Include all the command line parameters to be accepted and used.
+    '''
+    parser.add_option('', "--processors", type="str",
+                      help="Tell the application how many processors will be "
+                      "used. A positive number will establish the number of "
+                      "parallel workers and each will use one of the cores. "
+                      "With the string'max' the application will use all the "
+                      "available cores. Telling a negative number with be "
+                      "understood as how many below the maximum will be used.")
+    parser.add_option('', "--samples", type="int", default=100000,
+                      help="How many elements will be set in the arginLst.")
+    parser.add_option('', "--chunksizes", type="str", default="1,10,100,1000",
+                      help="Comma separated list of chunk sizes to compare.")
+
+
+def trivial(argin):
+    return argin
+
+
+def measure(samples, processors, chunksize, answer):
+    pool = Pool(trivial, range(samples), processors, chunksize=chunksize,
+                loggingFolder='.')
+    pool.checkPeriod = 1
+    t0 = datetime.now()
+    pool.start()
+    pool.waitUntilFinish()
+    t_diff = (datetime.now()-t0).total_seconds()
+    if len(pool.output) != samples:
+        print("\tchunksize %d collected %d of %d"
+              % (chunksize, len(pool.output), samples))
+    answer.put(t_diff)
+
+
+def main():
+    parser = OptionParser()
+    cmdArgs(parser)
+    (options, args) = parser.parse_args()
+    print("\n\tUsing yamp-%s\n" % (version()))
+    print("\t%10s %12s %16s" % ("chunksize", "seconds", "us per task"))
+    for chunksize in [int(c) for c in options.chunksizes.split(',')]:
+        t_diff = isolated(measure, options.samples,
+                          options.processors, chunksize)
+        print("\t%10d %12.3f %16.2f"
+              % (chunksize, t_diff, t_diff*1e6/options.samples))
+    print("")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+from multiprocessing import cpu_count
+from optparse import OptionParser
+from time import time
+from isolation import isolated
+from yamp import Fleet, Pool, version
+
+
+def cmdArgs(parser):
+    '''Include all the command line parameters to be accepted and used.
+    '''
+    parser.add_option('', "--processors", type="int", default=cpu_count(),
+                      help="Number of workers.")
+    parser.add_option('', "--batches", type="int", default=100,
+                      help="Number of batches to be processed.")
+    parser.add_option('', "--batch-size", type="int", default=50,
+                      help="Number of inputs in each batch.")
+
+
+def square(argin):
+    return argin*argin
+
+
+def pools(options, answer):
+    """Each batch in a new Pool."""
+    t0 = time()
+    for i in range(options.batches):
+        pool = Pool(square, range(options.batch_size), options.processors,
+                    loggingFolder='.')
+        pool.start()
+        pool.waitUntilFinish()
+    answer.put(time()-t0)
+
+
+def fleet(options, answer):
+    """All the batches in the same Fleet."""
+    t0 = time()
+    fleet = Fleet(options.processors, loggingFolder='.')
+    for i in range(options.batches):
+        fleet.map(square, range(options.batch_size))
+    fleet.close()
+    fleet.join()
+    answer.put(time()-t0)
+
+
+def main():
+    parser = OptionParser()
+    cmdArgs(parser)
+    (options, args) = parser.parse_args()
+    print("\n\tUsing yamp-%s\n" % (version()))
+    print("\t%d batches of %d inputs with %d workers"
+          % (options.batches, options.batch_size, options.processors))
+    print("\t%8s %12s" % ("", "time (s)"))
+    print("\t%8s %12.4f" % ("Fleet", isolated(fleet, options)))
+    print("\t%8s %12.4f" % ("Pool", isolated(pools, options)))
+    print("")
+
+
+if __name__ == "__main__":
+    main()
@@ -95,6 +95,12 @@ def cmdArgs(parser):
                       help="Get into symlinks.")
     parser.add_option('-o', "--output", default="hash.txt",
                       help="File name to write the output.")
+    parser.add_option('', "--timeout", type="float", default=None,
+                      help="Seconds to hash a file before giving up (for "
+                      "example, on a stalled NFS).")
+    parser.add_option('', "--backend", type="str", default=None,
+                      help="'processes' or 'threads' (hashing mostly waits "
+                      "the disk).")
 
 
 MIN_T = 10
@@ -112,6 +118,7 @@ def main():
         pool = Pool(hasher, arginLst, options.processors, debug=True,
                     logLevel=DEBUG, log2File=True, loggerName='Hasher',
                     loggingFolder='.', postHook=output,
+                    timeout=options.timeout, backend=options.backend,
                     postExtraArgs={'lock': printerLock,
                                    'outputFile': './hashlst'})
         pool.start()
@@ -126,7 +133,10 @@ def main():
                 s = "%s" % each
                 states[i] = s[0]
             progress = pool.progress
-            print("\n\tprogress: %.2f%%" % ((progress)*100))
+            if progress is None:  # input not yet exhausted
+                print("\n\tprogress: %d collected" % (len(pool.output)))
+            else:
+                print("\n\tprogress: %.2f%%" % ((progress)*100))
             print("\tcontributions: %s" % (contributions))
             print("\tstates: %s" % (states))
             print("\tcomputation: %s %s\n" % (computation, perWorker))
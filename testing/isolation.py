@@ -0,0 +1,38 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+from multiprocessing import Process, Queue
+
+
+def isolated(procedure, *args):
+    """Each measurement in its own process, starting from the same state.
+
+       The procedure receives the given arguments followed by a queue where
+       it has to put its answer, that is what this call returns.
+    """
+    answer = Queue()
+    process = Process(target=procedure, args=args+(answer,))
+    process.start()
+    result = answer.get()
+    process.join()
+    return result
@@ -0,0 +1,101 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+from ctypes import c_double
+from multiprocessing import cpu_count
+from multiprocessing.sharedctypes import RawValue
+from optparse import OptionParser
+from random import random
+from time import sleep, time
+from isolation import isolated
+from yamp import Pool, version
+
+# when the last call to the target has started and ended (seen by the forks)
+lastStart = RawValue(c_double, 0.0)
+lastEnd = RawValue(c_double, 0.0)
+
+
+def cmdArgs(parser):
+    '''Include all the command line parameters to be accepted and used.
+    '''
+    parser.add_option('', "--processors", type="int", default=cpu_count(),
+                      help="Number of workers.")
+    parser.add_option('', "--task-time", type="float", default=0.01,
+                      help="Seconds each input takes.")
+    parser.add_option('', "--chunksize", type="int", default=50,
+                      help="Number of inputs in each chunk.")
+    parser.add_option('', "--repetitions", type="int", default=5,
+                      help="Number of pauses and resumes to measure.")
+
+
+def busy(argin):
+    lastStart.value = time()
+    sleep(busy.taskTime)
+    lastEnd.value = time()
+    return argin
+
+
+def measure(mode, options, answer):
+    """Pause to quiescent and resume to first call latencies of a mode."""
+    busy.taskTime = options.task_time
+    pool = Pool(busy, range(10**6), options.processors,
+                chunksize=options.chunksize, pauseMode=mode,
+                loggingFolder='.')
+    pool.start()
+    pauses, resumes = [], []
+    chunkTime = options.task_time*options.chunksize
+    settle = max(1.0, 2*chunkTime)
+    for i in range(options.repetitions):
+        sleep(0.5+random()*chunkTime)  # anywhere in the chunk
+        t0 = time()
+        pool.pause()
+        sleep(settle)  # time enough to end a whole chunk
+        pauses.append(max(0.0, lastEnd.value-t0))
+        t0 = time()
+        pool.resume()
+        while lastStart.value < t0:
+            sleep(0.0001)
+        resumes.append(lastStart.value-t0)
+    pool.stop()
+    pool.waitUntilFinish()
+    answer.put((pauses, resumes))
+
+
+def main():
+    parser = OptionParser()
+    cmdArgs(parser)
+    (options, args) = parser.parse_args()
+    print("\n\tUsing yamp-%s\n" % (version()))
+    print("\t%d workers, chunks of %d inputs of %g seconds"
+          % (options.processors, options.chunksize, options.task_time))
+    print("\t%12s %18s %18s" % ("pauseMode", "to quiescent (s)",
+                                "to first call (s)"))
+    for mode in ['suspend', 'cooperative']:
+        pauses, resumes = isolated(measure, mode, options)
+        print("\t%12s %18.4f %18.4f"
+              % (mode, sum(pauses)/len(pauses), sum(resumes)/len(resumes)))
+    print("")
+
+
+if __name__ == "__main__":
+    main()
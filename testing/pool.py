@@ -113,7 +113,10 @@ def main():
                 s = "%s" % each
                 states[i] = s[0]
             progress = pool.progress
-            print("\n\tprogress: %.2f%%" % ((progress)*100))
+            if progress is None:  # input not yet exhausted
+                print("\n\tprogress: %d collected" % (len(pool.output)))
+            else:
+                print("\n\tprogress: %.2f%%" % ((progress)*100))
             print("\tcontributions: %s" % (contributions))
             print("\tstates: %s" % (states))
             print("\tcomputation: %s %s\n" % (computation, perWorker))
@@ -0,0 +1,148 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+
+from multiprocessing import cpu_count
+from optparse import OptionParser
+from os import _exit
+from sys import exit
+from threading import Lock
+from time import sleep, time
+from isolation import isolated
+from yamp import Pool, RetryPolicy, TaskError, TaskTimeout, version
+from yamp import worker
+
+# the argins that misbehave, by their last digit
+CRASH = 3  # kills its worker
+SLOW = 5  # exceeds the timeout
+FLAKY = 7  # raises in the first attempts only
+FAULTY = 9  # always raises
+
+# each worker process has its own
+attempts = {}
+
+
+def target(argin):
+    if argin % 10 == CRASH:
+        _exit(1)
+    elif argin % 10 == SLOW:
+        sleep(10)
+    elif argin % 10 == FLAKY:
+        attempts[argin] = attempts.get(argin, 0)+1
+        if attempts[argin] < 3:
+            raise RuntimeError("attempt %d" % (attempts[argin]))
+    elif argin % 10 == FAULTY:
+        raise ValueError("always")
+    return argin
+
+
+def cmdArgs(parser):
+    '''Include all the command line parameters to be accepted and used.
+    '''
+    parser.add_option('', "--processors", type="int",
+                      default=min(cpu_count(), 4), help="Number of workers.")
+    parser.add_option('', "--inputs", type="int", default=100,
+                      help="Number of inputs.")
+    parser.add_option('', "--chunksize", type="int", default=5,
+                      help="Inputs that travel together.")
+    parser.add_option('', "--transport", type="str", default=None,
+                      help="How the inputs and outputs travel.")
+    parser.add_option('', "--limit", type="float", default=60,
+                      help="Seconds after which a Pool is considered hung.")
+
+
+def expected(argin, scenario):
+    """Name of the argout type the argin shall have in the scenario."""
+    if scenario == 'unpicklable' and not isinstance(argin, int):
+        return 'TaskError'
+    if scenario == 'lost' and argin // 10 == 2:
+        return 'TaskError'
+    if not isinstance(argin, int) or scenario != 'misbehaving':
+        return 'int'
+    return {CRASH: 'TaskError', SLOW: 'TaskTimeout',
+            FAULTY: 'TaskError'}.get(argin % 10, 'int')
+
+
+def loseChunk20(procedure):
+    """The worker dies after taking the chunk 20, before telling it."""
+    def processChunk(self, chunk):
+        if chunk[0] == 20:
+            _exit(3)
+        return procedure(self, chunk)
+    return processChunk
+
+
+def measure(scenario, options, answer):
+    inputs = list(range(options.inputs))
+    chunksize = options.chunksize
+    kwargs = {}
+    if scenario == 'misbehaving':
+        kwargs = {'timeout': 0.5, 'retryPolicy': RetryPolicy(3)}
+    elif scenario == 'unpicklable':
+        inputs[len(inputs)//2] = Lock()
+    elif scenario == 'lost':
+        chunksize = 10
+        worker.Worker._Worker__processChunk = \
+            loseChunk20(worker.Worker._Worker__processChunk)
+    pool = Pool(target if scenario == 'misbehaving' else abs, inputs,
+                options.processors, chunksize=chunksize,
+                transport=options.transport, **kwargs)
+    t0 = time()
+    pool.start()
+    while pool.isAlive() and time()-t0 < options.limit:
+        sleep(0.01)
+    t_diff = time()-t0
+    if pool.isAlive():
+        pool.stop()
+        answer.put((t_diff, None))
+        return
+    failures = [argin for argin, argout in pool.output
+                if type(argout).__name__ != expected(argin, scenario)]
+    if len(pool.output) != len(inputs):
+        failures.append("%d outputs" % (len(pool.output)))
+    answer.put((t_diff, failures))
+
+
+def main():
+    parser = OptionParser()
+    cmdArgs(parser)
+    (options, args) = parser.parse_args()
+    print("\n\tUsing yamp-%s\n" % (version()))
+    print("\t%12s %12s %s" % ("scenario", "time (s)", "result"))
+    failed = False
+    for scenario in ['misbehaving', 'unpicklable', 'lost']:
+        t_diff, failures = isolated(measure, scenario, options)
+        if failures is None:
+            result = "HUNG"
+        elif len(failures) > 0:
+            result = "FAILED %s" % (failures[:10])
+        else:
+            result = "ok"
+        failed = failed or result != "ok"
+        print("\t%12s %12.3f %s" % (scenario, t_diff, result))
+    print("")
+    if failed:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+from datetime import datetime
+from multiprocessing import Process, Queue
+from optparse import OptionParser
+from yamp import version
+from yamp.ringbuffer import RingBuffer
+
+
+def cmdArgs(parser):
+    '''Include all the command line parameters to be accepted and used.
+    '''
+    parser.add_option('', "--messages", type="int", default=100000,
+                      help="How many messages the producer will send.")
+    parser.add_option('', "--payload", type="int", default=16,
+                      help="Bytes of each message.")
+
+
+def producer(channel, messages, payload):
+    message = [0, 'x'*payload]
+    for i in range(messages):
+        message[0] = i
+        channel.put(message)
+
+
+def measure(channel, messages, payload):
+    process = Process(target=producer, args=(channel, messages, payload))
+    t0 = datetime.now()
+    process.start()
+    for i in range(messages):
+        channel.get()
+    t_diff = (datetime.now()-t0).total_seconds()
+    process.join()
+    return t_diff
+
+
+def main():
+    parser = OptionParser()
+    cmdArgs(parser)
+    (options, args) = parser.parse_args()
+    print("\n\tUsing yamp-%s\n" % (version()))
+    print("\t%10s %12s %16s" % ("transport", "seconds", "messages/s"))
+    for name, channel in [('queue', Queue()), ('ring', RingBuffer())]:
+        t_diff = measure(channel, options.messages, options.payload)
+        print("\t%10s %12.3f %16.0f"
+              % (name, t_diff, options.messages/t_diff))
+    print("")
+
+
+if __name__ == "__main__":
+    main()
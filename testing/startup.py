@@ -0,0 +1,72 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+from multiprocessing import cpu_count
+from optparse import OptionParser
+from time import sleep, time
+from isolation import isolated
+from yamp import Pool, version
+
+HOLD = 0.5  # seconds each worker holds its input
+
+
+def cmdArgs(parser):
+    '''Include all the command line parameters to be accepted and used.
+    '''
+    parser.add_option('', "--processors", type="int", default=cpu_count(),
+                      help="Measure from 1 to this number of workers.")
+
+
+def stamp(argin):
+    """Report when this input has been taken, and keep the worker busy."""
+    t = time()
+    sleep(HOLD)
+    return t
+
+
+def measure(workers, answer):
+    t0 = time()
+    pool = Pool(stamp, range(workers), workers, loggingFolder='.')
+    t_build = time()-t0
+    t0 = time()
+    pool.start()
+    pool.waitUntilFinish()
+    stamps = [argout-t0 for argin, argout in pool.output]
+    answer.put((t_build, min(stamps), max(stamps)))
+
+
+def main():
+    parser = OptionParser()
+    cmdArgs(parser)
+    (options, args) = parser.parse_args()
+    print("\n\tUsing yamp-%s\n" % (version()))
+    print("\t%8s %12s %16s %16s"
+          % ("workers", "build (s)", "first start (s)", "last start (s)"))
+    for workers in range(1, options.processors+1):
+        t_build, first, last = isolated(measure, workers)
+        print("\t%8d %12.4f %16.4f %16.4f" % (workers, t_build, first, last))
+    print("")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+from multiprocessing import cpu_count
+from optparse import OptionParser
+from time import time
+from isolation import isolated
+from yamp import Pool, version
+
+
+def cmdArgs(parser):
+    '''Include all the command line parameters to be accepted and used.
+    '''
+    parser.add_option('', "--processors", type="int", default=cpu_count(),
+                      help="Number of workers.")
+    parser.add_option('', "--inputs", type="int", default=100000,
+                      help="Number of inputs.")
+    parser.add_option('', "--chunksize", type="int", default=100,
+                      help="Inputs that travel together.")
+    parser.add_option('', "--repeat", type="int", default=3,
+                      help="Times each measurement is made (the best is "
+                      "reported).")
+    parser.add_option('', "--output", type="str", default=None,
+                      help="File where to write the Chrome trace of the "
+                      "last traced run.")
+
+
+def identity(argin):
+    """The cheapest target, so what is measured is the overhead."""
+    return argin
+
+
+def measure(workers, inputs, chunksize, trace, output, answer):
+    pool = Pool(identity, range(inputs), workers, chunksize=chunksize,
+                trace=trace, loggingFolder='.')
+    t0 = time()
+    pool.start()
+    pool.waitUntilFinish()
+    t_diff = time()-t0
+    if trace and output is not None:
+        pool.dumpTrace(output)  # out of the measurement
+    answer.put(t_diff)
+
+
+def main():
+    parser = OptionParser()
+    cmdArgs(parser)
+    (options, args) = parser.parse_args()
+    print("\n\tUsing yamp-%s\n" % (version()))
+    print("\t%8s %12s %16s" % ("trace", "time (s)", "per input (us)"))
+    for trace in [False, True]:
+        elapsed = min(isolated(measure, options.processors, options.inputs,
+                               options.chunksize, trace, options.output)
+                      for i in range(options.repeat))
+        print("\t%8s %12.4f %16.2f" % (trace, elapsed,
+                                       elapsed/options.inputs*1e6))
+    print("")
+
+
+if __name__ == "__main__":
+    main()
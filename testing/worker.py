@@ -21,7 +21,7 @@ __copyright__ = "Copyright 2016 Sergi Blanch-Torne"
 __license__ = "GPLv3+"
 __status__ = "development"
 
-from yamp import Worker
+from yamp import Worker, EndOfInput
 from multiprocessing import Event as _Event
 from multiprocessing import Lock as _Lock
 from multiprocessing import Queue as _Queue
@@ -61,6 +61,7 @@ def firstTest():
     input = _Queue()
     for i in range(10):
         input.put(i)
+    input.put(EndOfInput())
     output = _Queue()
     # TODO: play with the checkPeriod
     start = _Event()
@@ -86,6 +87,7 @@ def secondTest():
     input = _Queue()
     for i in range(10):
         input.put(i)
+    input.put(EndOfInput())
     output = _Queue()
     # TODO: play with the checkPeriod
     start = _Event()
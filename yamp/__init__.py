@@ -23,4 +23,9 @@ __status__ = "development"
 
 from .version import version, VERSION
 from .yamp import Pool
-from .worker import Worker
+from .worker import Worker, EndOfInput, WorkerEnd
+from .fleet import Fleet, Result
+from .logger import LogQueue
+from .loadaverage import LoadAverage
+from .memorypercent import MemoryPercent
+from .task import Task, TaskTimeout, TaskError, RetryPolicy
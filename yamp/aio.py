@@ -0,0 +1,178 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+
+# Only for python >= 3.5: the Pool and the Worker import it softly. It is
+# written without async syntax, so the package still compiles in python 2.
+import asyncio as _asyncio
+from functools import partial as _partial
+from inspect import iscoroutinefunction as _iscoroutinefunction
+from .task import TaskError as _TaskError
+from .task import TaskTimeout as _TaskTimeout
+from .task import unwrap as _unwrap
+from time import time as _time
+
+CONCURRENCY = 100  # coroutines in flight per worker
+
+
+def isCoroutineFunction(target):
+    return _iscoroutinefunction(target)
+
+
+class Runner(object):
+    def __init__(self, target, concurrency=None, timeout=None,
+                 retryPolicy=None, preHook=None, postHook=None):
+        """
+            Event loop, of a worker, where the coroutines of the target are
+            executed with the argins of a chunk, up to concurrency of them at
+            the same time. It must be built where it will be used (after
+            the fork).
+
+            The timeout cancels the coroutine, and its argout is a
+            TaskTimeout, without killing anything. The coroutines that
+            raise are retried following the retryPolicy, waiting in the
+            loop, until their argout is a TaskError. The hooks are called
+            with the argin before the coroutine and with the argin and the
+            argout when it is done.
+        """
+        self.__target = target
+        self.__concurrency = concurrency or CONCURRENCY
+        self.__timeout = timeout
+        self.__retryPolicy = retryPolicy
+        self.__preHook = preHook
+        self.__postHook = postHook
+        self.__loop = _asyncio.new_event_loop()
+        self.__pending = None
+        self.__pairs = None
+        self.__times = None
+        self.__inFlight = 0
+        self.__finished = None
+
+    @property
+    def concurrency(self):
+        return self.__concurrency
+
+    def run(self, argins):
+        """
+            Execute the chunk and return the list of [argin, argout] pairs,
+            in the same order, and the seconds each one has used.
+        """
+        self.__pending = list(enumerate(argins))
+        self.__pending.reverse()
+        self.__pairs = [None]*len(argins)
+        self.__times = [0.0]*len(argins)
+        self.__inFlight = 0
+        self.__finished = self.__loop.create_future()
+        self.__loop.call_soon(self.__launch)
+        self.__loop.run_until_complete(self.__finished)
+        return self.__pairs, self.__times
+
+    def close(self):
+        self.__loop.close()
+
+    def __launch(self):
+        while self.__inFlight < self.__concurrency and \
+                len(self.__pending) > 0:
+            position, argin = self.__pending.pop()
+            if isinstance(argin, (_TaskTimeout, _TaskError)):
+                # it has already killed previous processes
+                self.__pairs[position] = [argin.argin, argin]
+                continue
+            self.__inFlight += 1
+            self.__start(position, argin, 1)
+        if self.__inFlight == 0 and len(self.__pending) == 0 and \
+                not self.__finished.done():
+            self.__finished.set_result(True)
+
+    def __start(self, position, argin, attempts):
+        unwrapped, timeout = _unwrap(argin, self.__timeout)
+        t0 = _time()
+        try:
+            if self.__preHook is not None:
+                self.__preHook(unwrapped)
+            coroutine = self.__target(unwrapped)
+            if timeout is not None:
+                coroutine = _asyncio.wait_for(coroutine, timeout)
+            task = _asyncio.ensure_future(coroutine, loop=self.__loop)
+        except Exception as e:
+            self.__failed(position, argin, attempts, t0, e)
+            return
+        task.add_done_callback(_partial(self.__done, position, argin,
+                                        attempts, t0))
+
+    def __done(self, position, argin, attempts, t0, task):
+        unwrapped, timeout = _unwrap(argin, self.__timeout)
+        try:
+            argout = task.result()
+        except _asyncio.TimeoutError:
+            argout = _TaskTimeout(unwrapped, timeout)
+        except Exception as e:
+            self.__failed(position, argin, attempts, t0, e)
+            return
+        self.__complete(position, unwrapped, argout, t0)
+
+    def __failed(self, position, argin, attempts, t0, exception):
+        unwrapped, timeout = _unwrap(argin)
+        if self.__retryPolicy is not None and \
+                self.__retryPolicy.retry(exception, attempts):
+            self.__times[position] += _time()-t0
+            self.__loop.call_later(self.__retryPolicy.delay(attempts),
+                                   self.__start, position, argin,
+                                   attempts+1)
+            return
+        try:
+            raise exception  # to have it as the one being handled
+        except Exception:
+            error = _TaskError.fromException(unwrapped, exception, attempts)
+        self.__complete(position, unwrapped, error, t0)
+
+    def __complete(self, position, argin, argout, t0):
+        self.__times[position] += _time()-t0
+        self.__pairs[position] = [argin, argout]
+        self.__inFlight -= 1
+        if self.__postHook is not None:
+            self.__postHook(argin, argout)
+        self.__launch()
+
+
+class AsyncIterator(object):
+    """
+        Adapter to consume a generator of the Pool with 'async for', without
+        blocking the event loop: each element is waited in an executor.
+    """
+    def __init__(self, generator, loop=None):
+        self.__generator = generator
+        self.__loop = loop
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        loop = self.__loop or _asyncio.get_event_loop()
+        return loop.run_in_executor(None, self.__next)
+
+    def __next(self):
+        try:
+            return next(self.__generator)
+        except StopIteration:
+            raise StopAsyncIteration
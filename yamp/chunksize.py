@@ -0,0 +1,98 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+from .logger import Logger as _Logger
+
+AUTO = 'auto'
+_CHUNKTIME = (0.05, 0.2)  # seconds
+_MAXCHUNKSIZE = 10000
+
+
+class Chunksize(_Logger):
+    def __init__(self, value=1, chunkTime=None, *args, **kwargs):
+        """
+            Number of elements that will travel together in a chunk. It can be
+            fixed or, with the value 'auto', adapted to what the workers
+            report about the time they use in the target.
+
+            Arguments:
+            - value: positive integer or 'auto'.
+            - chunkTime: (optional) pair (low, high) with the window of
+              seconds that a chunk should take to be processed in auto mode.
+        """
+        super(Chunksize, self).__init__(*args, **kwargs)
+        self.__auto = value == AUTO
+        if self.__auto:
+            value = 1
+        self.__value = int(value)
+        if self.__value < 1:
+            raise AssertionError("chunksize must be a positive integer "
+                                 "or '%s'" % (AUTO))
+        low, high = chunkTime or _CHUNKTIME
+        if not 0 < low <= high:
+            raise AssertionError("chunkTime must be a (low, high) window")
+        self.__low = float(low)
+        self.__high = float(high)
+        self.__lastCtr = 0
+        self.__lastComputation = 0.0
+
+    def __str__(self):
+        if self.__auto:
+            return "%s(%d)" % (AUTO, self.__value)
+        return "%d" % (self.__value)
+
+    @property
+    def auto(self):
+        return self.__auto
+
+    @property
+    def value(self):
+        return self.__value
+
+    def review(self, ctr, computation):
+        """
+            Given the accumulated number of elements processed and the time
+            used to compute them, in auto mode resize the chunks to take a
+            time within the window.
+        """
+        if not self.__auto:
+            return self.__value
+        tasks = ctr - self.__lastCtr
+        if tasks < self.__value:
+            return self.__value  # not enough new information
+        elapsed = computation - self.__lastComputation
+        self.__lastCtr = ctr
+        self.__lastComputation = computation
+        perTask = elapsed/tasks
+        if self.__low <= perTask*self.__value <= self.__high:
+            return self.__value
+        if perTask > 0:
+            value = int((self.__low+self.__high)/2/perTask)
+        else:
+            value = self.__value*2
+        value = max(1, min(value, _MAXCHUNKSIZE))
+        if value != self.__value:
+            self.debug("chunksize %d -> %d (%g seconds per element)",
+                       self.__value, value, perTask)
+            self.__value = value
+        return self.__value
@@ -21,27 +21,66 @@ __copyright__ = "Copyright 2016 Sergi Blanch-Torne"
 __license__ = "GPLv3+"
 __status__ = "development"
 
-from .events import EventManager as _EventManager
 from .logger import Logger as _Logger
 from multiprocessing import Event as _Event
 
+PRESSED = 'pressed'  # over the warning
+STEADY = 'steady'  # below the warning, but not enough to be relieved
+RELIEVED = 'relieved'  # below the warning with margin (or without warning)
+_HYSTERESIS = 0.9  # ratio of the warning below which it is relieved
+
 
 class ConditionCheck(_Logger):
     def __init__(self, *args, **kwargs):
+        """
+            Condition of a resource that pauses the Pools it governs when
+            the limit is reached. The same condition can govern many of them.
+        """
         super(ConditionCheck, self).__init__(*args, **kwargs)
         self.__IPaused = _Event()
-        self.__events = _EventManager()
+        self.__governed = []
+
+    def _govern(self, events):
+        """Include the EventManager of a Pool in the ones to pause."""
+        if events in self.__governed:
+            return
+        self.__governed.append(events)
+        if self._IBookPause():
+            events.pause(book=True)
+
+    def _release(self, events):
+        """Exclude the EventManager of a Pool that has finished."""
+        try:
+            self.__governed.remove(events)
+        except ValueError:
+            pass
 
     def _IBookPause(self):
         return self.__IPaused.is_set()
 
     def _bookPause(self):
-        self.__events.pause(book=True)
-        self.__IPause.set()
+        for events in list(self.__governed):
+            events.pause(book=True)
+        self.__IPaused.set()
 
     def _resume(self):
-        self.__events.resume()
-        self.__IPause.clear()
+        for events in list(self.__governed):
+            events.resume(book=True)
+        self.__IPaused.clear()
+
+    def _log(self, msg):
+        # the warning property hides the warning method of the Logger
+        _Logger.warning(self, msg)
+
+    def _pressure(self, value, warning):
+        """Pressure of a single value with respect to its warning."""
+        if warning is None or value is None:
+            return RELIEVED
+        if value >= warning:
+            return PRESSED
+        if value < warning*_HYSTERESIS:
+            return RELIEVED
+        return STEADY
 
     def value():
         def fget(self):
@@ -90,3 +129,12 @@ class ConditionCheck(_Logger):
 
     def review(self):
         raise NotImplementedError("Subclass must implement it")
+
+    def pressure(self):
+        """
+            How the current value is with respect to the warning: PRESSED,
+            STEADY or RELIEVED. The gap between the warning and the relief
+            is the hysteresis, so an oscillating value doesn't change it
+            every time.
+        """
+        raise NotImplementedError("Subclass must implement it")
@@ -0,0 +1,90 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+from .conditioncheck import PRESSED as _PRESSED
+from .conditioncheck import RELIEVED as _RELIEVED
+from .logger import Logger as _Logger
+from time import time as _time
+
+_DWELL = 5.0  # seconds between changes in the number of active workers
+
+
+class Elastic(_Logger):
+    def __init__(self, maximum, minimum=1, dwell=None, *args, **kwargs):
+        """
+            Number of workers that can be active, between a minimum and a
+            maximum, that is lowered one by one while the conditions are
+            pressed and raised one by one once they are relieved.
+
+            Arguments:
+            - maximum: number of workers in the Pool.
+            - minimum: (optional) number of workers that are never parked.
+            - dwell: (optional) seconds that a number of active workers is
+              kept before a new change.
+        """
+        super(Elastic, self).__init__(*args, **kwargs)
+        self.__maximum = maximum
+        self.__minimum = max(1, min(minimum, maximum))
+        self.__dwell = _DWELL if dwell is None else dwell
+        self.__active = maximum
+        self.__lastChange = 0
+
+    @property
+    def active(self):
+        return self.__active
+
+    @property
+    def maximum(self):
+        return self.__maximum
+
+    @property
+    def minimum(self):
+        return self.__minimum
+
+    def review(self, pressure):
+        """
+            Given the pressure of the conditions, return the number of
+            workers that can be active.
+        """
+        if _time()-self.__lastChange < self.__dwell:
+            return self.__active
+        if pressure == _PRESSED and self.__active > self.__minimum:
+            self.__active -= 1
+            self.info("Pressed, reducing to %d active workers"
+                      % (self.__active))
+        elif pressure == _RELIEVED and self.__active < self.__maximum:
+            self.__active += 1
+            self.info("Relieved, raising to %d active workers"
+                      % (self.__active))
+        else:
+            return self.__active
+        self.__lastChange = _time()
+        return self.__active
+
+    def release(self):
+        """All the workers active again, as there is no input to share."""
+        if self.__active != self.__maximum:
+            self.info("Releasing the %d parked workers"
+                      % (self.__maximum-self.__active))
+            self.__active = self.__maximum
+        return self.__active
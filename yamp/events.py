@@ -21,171 +21,238 @@ __copyright__ = "Copyright 2016 Sergi Blanch-Torne"
 __license__ = "GPLv3+"
 __status__ = "development"
 
+from ctypes import c_double as _double
+from ctypes import c_longlong as _longlong
 from datetime import datetime as _datetime
-from .logger import Singleton as _Singleton
-from multiprocessing import Event as _Event
-from multiprocessing import current_process as _current_process
-from time import sleep as _sleep
-from threading import current_thread as _current_thread
-from threading import Event as _ThreadEvent
-from traceback import print_exc as _print_exc
+from errno import EAGAIN as _EAGAIN
+from fcntl import fcntl as _fcntl
+from fcntl import F_GETFL as _F_GETFL
+from fcntl import F_SETFL as _F_SETFL
+from .logger import Logger as _Logger
+from multiprocessing import Lock as _Lock
+from multiprocessing import Pipe as _Pipe
+from multiprocessing.sharedctypes import RawArray as _RawArray
+from multiprocessing.sharedctypes import RawValue as _RawValue
+from os import O_NONBLOCK as _O_NONBLOCK
+from time import time as _time
 
+SUSPEND = 'suspend'  # pause freezing the processes (psutil)
+COOPERATIVE = 'cooperative'  # pause by the workers themselves, between tasks
 
-class EventManager(_Singleton):
+# fields of the state block
+_STATE = 0  # bits of what has been emitted
+_GENERATION = 1  # number of changes in the state
+_BOOKED = 2  # pause requests that only who booked them can release
+_REQUESTED = 3  # pause requests that any resume can release
+_FIELDS = 4
+
+# bits of the state
+_STARTED = 1
+_PAUSED = 2
+_STOPPED = 4
+
+
+class _Level(object):
+    def __init__(self, up=False):
+        """
+            Pipe that is readable while the level is up: up() writes a
+            message that only down() reads. Who waits only polls the pipe,
+            so being killed meanwhile doesn't affect anyone else.
+        """
+        self.__reader, self.__writer = _Pipe(False)
+        if up:
+            self.up()
+
+    def up(self):
+        self.__writer.send_bytes(b'.')
+
+    def down(self):
+        while self.__reader.poll():
+            self.__reader.recv_bytes()
+
+    def wait(self, timeout=None):
+        """Block until the level is up or the timeout, return if it is."""
+        return self.__reader.poll(timeout)
+
+
+class EventManager(_Logger):
     def __init__(self, *args, **kwargs):
+        """
+            Control plane of the Pool and its workers. The state (started,
+            paused, stopped), the number of changes and the pause requests
+            are a block of shared memory, so all the processes see the same
+            and it can be read without any syscall. The changes are made
+            with a lock and who waits blocks on a pipe that is readable while
+            what it waits for holds: a process killed while it waits (unlike
+            the waiter of a condition) doesn't block who emits the next
+            change.
+
+            Each Pool has its own, that its workers inherit when forked.
+        """
         super(EventManager, self).__init__(*args, **kwargs)
-        self.__startEvent = _Event()
-        self.__whenStart = None
-        self.__stepEvent = _Event()
-        self.__pauseEvent = _Event()
-        self.__pauseRequesterStack = []
-        self.__resumeEvent = _Event()
-        self.__stopEvent = _Event()
-        # for self.__startEvent, use threading.Event instead of
-        # multiprocessing.Event hasn't change the minute delay
+        self.__state = _RawArray(_longlong, _FIELDS)
+        self.__whenStart = _RawValue(_double, 0.0)  # seen by the forks
+        self.__lock = _Lock()
+        # start and stop only go up, pause and resume alternate
+        self.__started = _Level()
+        self.__stopped = _Level()
+        self.__paused = _Level()
+        self.__resumed = _Level(up=True)
+        # to wake up who is waiting for any change (with other things). The
+        # writes don't block: when the pipe is full, nobody is reading it
+        # or there are already notifications pending
+        self.__notifyReader, self.__notifyWriter = _Pipe(False)
+        fd = self.__notifyWriter.fileno()
+        _fcntl(fd, _F_SETFL, _fcntl(fd, _F_GETFL) | _O_NONBLOCK)
 
     def start(self):
         # FIXME: this shall be only emitted by MainProcess, MainThread
-        if True:  # not self.__startEvent.is_set():
-            self.__startEvent.set()
-            self.__whenStart = _datetime.now()
-            self.debug("START event emitted")
-            _sleep(0.1)
-            return True
-        self.debug("START event already emitted")
-        return False
+        with self.__lock:
+            self.__whenStart.value = _time()
+            self.__change(_STARTED, 0)
+        self.debug("START event emitted")
+        return True
 
     def isStarted(self):
-        return self.__startEvent.is_set()
+        return bool(self.__state[_STATE] & _STARTED)
 
     def whenStarted(self):
-        return self.__whenStart
-
-    def step(self):
-        # FIXME: this shall only be emitted by Workers
-        self.__stepEvent.set()
-        self.debug("STEP event emitted")
+        if self.__whenStart.value == 0.0:
+            return None
+        return _datetime.fromtimestamp(self.__whenStart.value)
 
-    def stepClean(self):
-        self.__stepEvent.clear()
-        self.debug("STEP event catch")
+    @property
+    def startTime(self):
+        """Seconds since the epoch of the start event, 0.0 until then."""
+        return self.__whenStart.value
 
     def pause(self, book=False):
         """
             With this method the requester will ask emit the pause event.
             It can book the request to allow only itself to release the pause.
         """
-        try:
-            self.__storeRequester(book)
-            self.__emitPause()
-            return True
-        except Exception as e:
-            self.error("PAUSE request failed due to: %s" % (e))
-            _print_exc()
-            return False
+        with self.__lock:
+            self.__state[_BOOKED if book else _REQUESTED] += 1
+            if self.__state[_STATE] & _PAUSED:
+                self.debug("PAUSE already emitted, %d requests"
+                           % (self.pauseRequests))
+                return True
+            self.__change(_PAUSED, 0)
+        self.debug("PAUSE event emitted (book=%s)" % (book))
+        return True
 
     def isPaused(self):
-        return self.__pauseEvent.is_set() and not self.__resumeEvent.is_set()
+        """
+            A read of shared memory, cheap enough to be called between
+            tasks. Then waitResume() blocks until it is resumed or stopped.
+        """
+        return bool(self.__state[_STATE] & _PAUSED)
 
-    def resume(self):
+    def resume(self, book=False):
         """
             With this method the requester will ask to resume the process.
-            When itself is is the list of requesters, it will be removed from
-            there, or will remove one of the non-book requesters.
-            Only when the list is empty will the pause event be clear and
-            resume emitted.
+            It releases one of the booked requests (the requester must have
+            booked it) or one of the others. Only when there are no more
+            requests the pause is clear and resume emitted.
         """
-        try:
-            if self.__popRequester():
-                return self.__emitResume()
-        except Exception as e:
-            self.error("RESUME request failed due to: %s" % (e))
-            _print_exc()
-        return False
+        field = _BOOKED if book else _REQUESTED
+        with self.__lock:
+            if self.__state[field] == 0:
+                self.debug("RESUME unsatisfied, no %s requests"
+                           % ("booked" if book else "non booked"))
+                return False
+            self.__state[field] -= 1
+            if self.__state[_BOOKED]+self.__state[_REQUESTED] > 0:
+                self.debug("Resume with %d requests remaining"
+                           % (self.pauseRequests))
+                return False
+            self.__change(0, _PAUSED)
+        self.debug("RESUME event emitted")
+        return True
+
+    @property
+    def pauseRequests(self):
+        """Number of pause requests not yet released."""
+        return self.__state[_BOOKED]+self.__state[_REQUESTED]
 
     def stop(self):
         # FIXME: should it filter who can raise this event?
-        if not self.__stopEvent.is_set():
-            self.__stopEvent.set()
-            self.debug("STOP event emitted")
-            return True
-        return False
+        with self.__lock:
+            if self.__state[_STATE] & _STOPPED:
+                return False
+            # who is waiting the resume has to see the stop
+            self.__change(_STOPPED, _PAUSED)
+        self.debug("STOP event emitted")
+        return True
 
     def isStopped(self):
-        return self.__stopEvent.is_set()
+        return bool(self.__state[_STATE] & _STOPPED)
+
+    @property
+    def generation(self):
+        """Number of changes in the state, to know if something happened."""
+        return self.__state[_GENERATION]
 
     def waitStart(self, timeout=None):
         self.debug("waitStart(%s)" % (str(timeout)))
-        return self.__startEvent.wait(timeout)
-
-    def waitStep(self, timeout=None):
-        return self.__stepEvent.wait(timeout)
+        return self.__waitFor(self.isStarted, self.__started, timeout)
 
     def waitPause(self, timeout=None):
-        return self.__pauseEvent.wait(timeout)
+        return self.__waitFor(self.isPaused, self.__paused, timeout)
 
     def waitResume(self, timeout=None):
-        return self.__resumeEvent.wait(timeout)
+        return self.__waitFor(lambda: not self.isPaused(), self.__resumed,
+                              timeout)
 
     def waitStop(self, timeout=None):
-        return self.__stopEvent.wait(timeout)
-
-    # pause & resume ---
-
-    def __searchRequester(self):
-        nonBookRequest = None
-        processName = _current_process().name
-        threadName = _current_thread().name
-        for i, request in enumerate(self.__pauseRequesterStack):
-            if request[0] == processName and request[1] == threadName:
-                self.debug("Found (%s, %s) as requester in position %d"
-                           % (processName, threadName, i))
-                return (True, i)
-            elif nonBookRequest is None and request[2] is False:
-                nonBookRequest = i
-        self.debug("NOT found (%s, %s) as requester"
-                   % (processName, threadName))
-        if nonBookRequest is not None:
-            self.debug("But a nonBook request found from (%s, %s)"
-                       % (self.__pauseRequesterStack[nonBookRequest][0],
-                          self.__pauseRequesterStack[nonBookRequest][1]))
-        return (False, nonBookRequest)
-
-    def __storeRequester(self, book):
-        processName = _current_process().name
-        threadName = _current_thread().name
-        self.__pauseRequesterStack.append([processName, threadName, book])
-        self.debug("Stored (%s, %s) as a requester (book=%s)"
-                   % (processName, threadName, book))
-
-    def __popRequester(self):
-        found, pos = self.__searchRequester()
-        if found or pos is not None:
-            self.__pauseRequesterStack.pop(pos)
-            processName = _current_process().name
-            threadName = _current_thread().name
-            self.debug("Removed '%d'th requester" % (pos))
-            return True
-        self.debug("pop unsatisfied")
-        return False
-
-    def __emitPause(self):
-        if self.__resumeEvent.is_set():
-            self.__resumeEvent.clear()
-        if not self.__pauseEvent.is_set():
-            self.__pauseEvent.set()
-            self.debug("PAUSE event emitted")
-            return True
-        return False
-
-    def __emitResume(self):
-        if len(self.__pauseRequesterStack) == 0:
-            if self.__pauseEvent.is_set():
-                self.__pauseEvent.clear()
-            if not self.__resumeEvent.is_set():
-                self.__resumeEvent.set()
-            self.debug("RESUME event emitted")
-            return True
-        self.debug("Resume stack with %d elements"
-                   % (len(self.__pauseRequesterStack)))
-        return False
+        return self.__waitFor(self.isStopped, self.__stopped, timeout)
+
+    @property
+    def notifier(self):
+        """
+        Connection that becomes readable when start, pause, resume or stop
+        are emitted (to be used with multiprocessing.connection.wait).
+        """
+        return self.__notifyReader
+
+    def clearNotifications(self):
+        while self.__notifyReader.poll():
+            self.__notifyReader.recv_bytes()
+
+    # internal ---
+
+    def __change(self, set, clear):
+        """With the lock, modify the state bits (and their levels)."""
+        previous = self.__state[_STATE]
+        state = (previous | set) & ~clear
+        self.__state[_STATE] = state
+        self.__state[_GENERATION] += 1
+        changed = previous ^ state
+        if changed & _STARTED:
+            self.__started.up()
+        if changed & _STOPPED:
+            self.__stopped.up()
+        if changed & _PAUSED and state & _PAUSED:
+            self.__resumed.down()
+            self.__paused.up()
+        elif changed & _PAUSED:
+            self.__paused.down()
+            self.__resumed.up()
+        try:
+            self.__notifyWriter.send_bytes(b'.')
+        except (IOError, OSError) as e:
+            if e.errno != _EAGAIN:
+                raise
+
+    def __waitFor(self, predicate, level, timeout=None):
+        """Block on the level until the predicate is true."""
+        deadline = None if timeout is None else _time()+timeout
+        while not predicate():
+            if deadline is None:
+                level.wait()
+            else:
+                remaining = deadline-_time()
+                if remaining <= 0:
+                    return False
+                level.wait(remaining)
+        return True
@@ -0,0 +1,276 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+from itertools import count as _count
+from .logger import Logger as _Logger
+from .task import Task as _Task
+from .task import TaskError as _TaskError
+from .task import TaskTimeout as _TaskTimeout
+from multiprocessing import TimeoutError as _TimeoutError
+try:
+    from cPickle import dumps as _dumps
+    from cPickle import loads as _loads
+    from cPickle import HIGHEST_PROTOCOL as _HIGHEST_PROTOCOL
+except ImportError:
+    from pickle import dumps as _dumps
+    from pickle import loads as _loads
+    from pickle import HIGHEST_PROTOCOL as _HIGHEST_PROTOCOL
+try:
+    from Queue import Queue as _LocalQueue
+except ImportError:
+    from queue import Queue as _LocalQueue
+from threading import current_thread as _current_thread
+from threading import Event as _LocalEvent
+from threading import Lock as _Lock
+from threading import Thread as _Thread
+from .worker import THREADS as _THREADS
+from .yamp import Pool as _Pool
+
+_CLOSE = None  # mark in the submissions queue to let the fleet finish
+
+
+def _call(task):
+    """
+        Target of the fleet workers: call the function submitted with its
+        argument. When they travel to a child process they come pickled
+        together, so what cannot be unpickled there (like a function defined
+        after the fork) is the error of this submission.
+    """
+    ticket, function, argin = task
+    if function is None:
+        function, argin = _loads(argin)
+    return function(argin)
+
+
+class Result(object):
+    """
+        Placeholder of what a submission returns, available once a worker
+        has executed it.
+    """
+    def __init__(self, ticket):
+        self.__ticket = ticket
+        self.__done = _LocalEvent()
+        self.__success = None
+        self.__value = None
+
+    @property
+    def ticket(self):
+        return self.__ticket
+
+    def ready(self):
+        return self.__done.is_set()
+
+    def successful(self):
+        if not self.ready():
+            raise AssertionError("Result %d not ready" % (self.__ticket))
+        return self.__success
+
+    def wait(self, timeout=None):
+        return self.__done.wait(timeout)
+
+    def get(self, timeout=None):
+        """
+            Value returned by the function, or raise the exception it has
+            raised. If it is not ready within the timeout, TimeoutError.
+        """
+        if not self.__done.wait(timeout):
+            raise _TimeoutError("Result %d not ready" % (self.__ticket))
+        if not self.__success:
+            raise self.__value
+        return self.__value
+
+    def _set(self, success, value):
+        self.__success = success
+        self.__value = value
+        self.__done.set()
+
+
+class Fleet(_Logger):
+    def __init__(self, parallel=None, highWaterMark=None, transport=None,
+                 ringSize=None, maxTasks=None, maxRss=None, timeout=None,
+                 timeoutRetries=0, retryPolicy=None, backend=None,
+                 *args, **kwargs):
+        """
+            Long living pool of workers that accepts functions to be executed
+            by them with submit() and map(), as many times as needed, until it
+            is closed. The workers are forked only once and stay waiting
+            between batches.
+
+            The functions travel pickled to the workers, so they must be
+            defined at the module level (as for multiprocessing). When they
+            cannot be pickled the Result raises it at once.
+
+            Arguments are the ones of the Pool with the same name:
+            - parallel: (optional) number of workers.
+            - highWaterMark: (optional) tasks waiting in the input queue.
+            - transport: (optional) 'queue' or 'ring'.
+            - ringSize: (optional) bytes of each ring.
+            - maxTasks: (optional) tasks after which a worker is replaced.
+            - maxRss: (optional) resident bytes above which a worker is
+              replaced.
+            - timeout: (optional) seconds a submission can use.
+            - timeoutRetries: (optional) times a submission exceeding the
+              timeout is retried before the Result raises TaskTimeout.
+            - retryPolicy: (optional) RetryPolicy for the submissions that
+              raise. The Result raises the last exception (or a TaskError
+              when it cannot travel).
+            - backend: (optional) 'processes' or 'threads'.
+        """
+        super(Fleet, self).__init__(*args, **kwargs)
+        self.__tickets = _count()
+        self.__pending = {}
+        self.__lock = _Lock()
+        self.__closed = False
+        self.__pickled = backend != _THREADS  # the tasks go to processes
+        self.__submissions = _LocalQueue()
+        self.__pool = _Pool(_call, self.__tasks(), parallel,
+                            highWaterMark=highWaterMark, transport=transport,
+                            ringSize=ringSize, maxTasks=maxTasks,
+                            maxRss=maxRss, timeout=timeout,
+                            timeoutRetries=timeoutRetries,
+                            retryPolicy=retryPolicy, backend=backend,
+                            *args, **kwargs)
+        self._instances.append(self.__pool)
+        self.__dispatcher = _Thread(target=self.__dispatcherThread)
+        self.__dispatcher.setDaemon(True)
+        self.__dispatcher.start()
+
+    # Interface ---
+
+    def submit(self, function, argin, timeout=None):
+        """
+            Schedule function(argin) and return its Result. The timeout, if
+            given, replaces the one of the fleet for this submission.
+        """
+        failure = None
+        if self.__pickled:
+            try:
+                # together, to be unpickled by _call()
+                packed = _dumps((function, argin), _HIGHEST_PROTOCOL)
+            except Exception as e:
+                failure = e
+        with self.__lock:
+            if self.__closed:
+                raise AssertionError("Fleet already closed")
+            result = Result(next(self.__tickets))
+            if failure is None:
+                self.__pending[result.ticket] = result, argin
+        if failure is not None:
+            self.error("Submission %d cannot travel to the workers: %s"
+                       % (result.ticket, failure))
+            result._set(False, failure)
+            return result
+        if self.__pickled:
+            task = (result.ticket, None, packed)
+        else:
+            task = (result.ticket, function, argin)
+        if timeout is not None:
+            task = _Task(task, timeout)
+        self.__submissions.put(task)
+        return result
+
+    def map(self, function, iterable, timeout=None):
+        """
+            Execute the function with each element of the iterable and return
+            the list of values, in the same order. The first exception found
+            is raised. The timeout, as in submit(), is the one of each call.
+        """
+        results = [self.submit(function, argin, timeout)
+                   for argin in iterable]
+        return [result.get() for result in results]
+
+    def close(self):
+        """
+            No more submissions will be accepted, the workers finish once the
+            ones already made are done.
+        """
+        with self.__lock:
+            if self.__closed:
+                return
+            self.__closed = True
+        self.info("CLOSE has been requested to the Fleet")
+        self.__submissions.put(_CLOSE)
+
+    def stop(self):
+        """Finish the workers without waiting the pending submissions."""
+        self.close()
+        self.__pool.stop()
+
+    def join(self, timeout=None):
+        self.__dispatcher.join(timeout)
+        return not self.__dispatcher.is_alive()
+
+    def isAlive(self):
+        return self.__dispatcher.is_alive()
+
+    def is_alive(self):
+        return self.isAlive()
+
+    @property
+    def pending(self):
+        """Number of submissions not yet resolved."""
+        return len(self.__pending)
+
+    @property
+    def pool(self):
+        return self.__pool
+
+    # internal ---
+
+    def __tasks(self):
+        """Endless input of the pool, until the fleet is closed."""
+        while True:
+            task = self.__submissions.get()
+            if task is _CLOSE:
+                break
+            yield task
+
+    def __dispatcherThread(self):
+        _current_thread().name = "Dispatcher"
+        try:
+            for task, outcome in self.__pool.imap_unordered():
+                with self.__lock:
+                    result, argin = self.__pending.pop(task[0], (None, None))
+                if result is None:
+                    self.warning("Outcome of an unknown ticket %d"
+                                 % (task[0]))
+                elif isinstance(outcome, _TaskTimeout):
+                    result._set(False, _TaskTimeout(argin, outcome.timeout))
+                elif isinstance(outcome, _TaskError):
+                    error = outcome.exception or \
+                        _TaskError(argin, outcome.excType, outcome.message,
+                                   outcome.traceback, outcome.attempts)
+                    result._set(False, error)
+                else:
+                    result._set(True, outcome)
+        finally:
+            with self.__lock:
+                self.__closed = True
+                pending, self.__pending = self.__pending, {}
+            if len(pending) > 0:
+                self.warning("Fleet finished with %d submissions pending"
+                             % (len(pending)))
+            for result, argin in pending.values():
+                result._set(False, RuntimeError("Fleet finished before "
+                                                "executing it"))
+            self.debug("Dispatcher has finished its task")
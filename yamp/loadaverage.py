@@ -22,6 +22,9 @@ __license__ = "GPLv3+"
 __status__ = "development"
 
 from .conditioncheck import ConditionCheck as _ConditionCheck
+from .conditioncheck import PRESSED as _PRESSED
+from .conditioncheck import RELIEVED as _RELIEVED
+from .conditioncheck import STEADY as _STEADY
 from os import getloadavg as _getloadavg
 
 
@@ -82,10 +85,20 @@ class LoadAverage(_ConditionCheck):
             self._resume()
         elif self.__compare(self.__loadAverage, self.warning):
             if self.__compare(self.__loadAverage, previous):
-                self.warning("load average %s" % (str(self.__loadAverage)))
+                self._log("load average %s" % (str(self.__loadAverage)))
         else:
             self.debug("load average %s" % (str(self.__loadAverage)))
 
+    def pressure(self):
+        """The worst of the pressures of the three averages."""
+        value = self.value
+        pressures = [self._pressure(value[i], self.warning[i])
+                     for i in range(3)]
+        for pressure in [_PRESSED, _STEADY]:
+            if pressure in pressures:
+                return pressure
+        return _RELIEVED
+
     def __compare(self, test, reference):
         booleans = []
         for i in range(3):
@@ -25,13 +25,72 @@ from datetime import datetime as _datetime
 import logging as _logging
 from logging import handlers as _handlers
 from multiprocessing import current_process as _current_process
-from multiprocessing import Lock as _Lock
+from .pipequeue import PipeQueue as _PipeQueue
+from sys import stdout as _stdout
 from threading import current_thread as _current_thread
+from threading import Thread as _Thread
+from time import time as _time
 import os
-
-
-global lock
-lock = _Lock()
+try:
+    _integers = (int, long)
+except NameError:  # python 3
+    _integers = (int,)
+
+_LEVELSTR = {_logging.NOTSET: '',
+             _logging.CRITICAL: 'CRITICAL',
+             _logging.ERROR: 'ERROR',
+             _logging.WARNING: 'WARNING',
+             _logging.INFO: 'INFO',
+             _logging.DEBUG: 'DEBUG'}
+_ENDOFLOG = None  # mark in the LogQueue to let the listener finish
+
+
+def _emit(level, loggerName, processName, threadName, msg, log2file, when):
+    """Write a message already formatted, in the file and the console."""
+    if log2file:
+        devlogger = _logging.getLogger(loggerName)
+        record = devlogger.makeRecord(loggerName, level, "(unknown file)", 0,
+                                      msg, None, None)
+        record.processName = processName
+        record.threadName = threadName
+        record.created = when
+        devlogger.handle(record)
+    # a single write, so the lines of many processes don't get mixed
+    _stdout.write("%s - %8s - %s - %s - %s - %s\n"
+                  % (_datetime.fromtimestamp(when), _LEVELSTR[level],
+                     loggerName, processName, threadName, msg))
+    _stdout.flush()
+
+
+class LogQueue(object):
+    def __init__(self):
+        """
+            Queue where the loggers of any process put their messages, and
+            a listener thread, in the process that builds it, that writes
+            them. So the workers don't write files nor the console. It is
+            given to the Pool as the logQueue of the logger arguments.
+        """
+        self.__queue = _PipeQueue()
+        self.__listener = _Thread(target=self.__listen)
+        self.__listener.setDaemon(True)
+        self.__listener.start()
+
+    def put(self, level, loggerName, msg, log2file):
+        self.__queue.put((level, loggerName, _current_process().name,
+                          _current_thread().name, msg, log2file, _time()))
+
+    def close(self):
+        """Write what is in the queue and finish the listener."""
+        self.__queue.put(_ENDOFLOG)
+        self.__listener.join()
+
+    def __listen(self):
+        _current_thread().name = "LogListener"
+        while True:
+            record = self.__queue.get()
+            if record is _ENDOFLOG:
+                break
+            _emit(*record)
 
 
 class Logger(object):
@@ -43,15 +102,10 @@ class Logger(object):
     INFO = _logging.INFO
     DEBUG = _logging.DEBUG
 
-    _levelStr = {_logging.NOTSET: '',
-                 _logging.CRITICAL: 'CRITICAL',
-                 _logging.ERROR: 'ERROR',
-                 _logging.WARNING: 'WARNING',
-                 _logging.INFO: 'INFO',
-                 _logging.DEBUG: 'DEBUG'}
+    _levelStr = _LEVELSTR
 
     def __init__(self, debug=False, logLevel=_logging.INFO, log2File=False,
-                 loggerName=None, loggingFolder=None):
+                 loggerName=None, loggingFolder=None, logQueue=None):
         super(Logger, self).__init__()
         # prepare internal vbles ---
         self.__logEnable = debug
@@ -60,43 +114,46 @@ class Logger(object):
         self.__loggerName = loggerName or 'yamp'
         self.__loggingFolder = loggingFolder
         self.__loggingFile = None
+        self.__logQueue = logQueue
         self._instances = []  # FIXME: this is dirty and ugly
         # setup the object ---
         self.__devlogger = _logging.getLogger(self.__loggerName)
         self.__handler = None
         self.__prepareHandler()
 
-    def logMessage(self, msg, level):
-        _tag = self._levelStr[level]
-        prt_msg = "%8s - %s - %s - %s - %s" % (_tag, self.__loggerName,
-                                               _current_process().name,
-                                               _current_thread().name, msg)
-        if self.__logEnable and level >= self.__logLevel:
-            if self.__log2file:
-                method = {self.CRITICAL: self.__devlogger.critical,
-                          self.ERROR: self.__devlogger.error,
-                          self.WARNING: self.__devlogger.warn,
-                          self.INFO: self.__devlogger.info,
-                          self.DEBUG: self.__devlogger.debug}
-                method[level](msg)
-            with lock:
-                when = str(_datetime.now())
-                print("%s - %s" % (when, prt_msg))
-
-    def critical(self, msg):
-        self.logMessage(msg, self.CRITICAL)
-
-    def error(self, msg):
-        self.logMessage(msg, self.ERROR)
-
-    def warning(self, msg):
-        self.logMessage(msg, self.WARNING)
-
-    def info(self, msg):
-        self.logMessage(msg, self.INFO)
-
-    def debug(self, msg):
-        self.logMessage(msg, self.DEBUG)
+    def logMessage(self, msg, level, *args):
+        """
+            Nothing is formatted when the level is not logged: the msg is
+            only completed with the args (as msg % args) when it is.
+        """
+        if not self.__logEnable or level < self.__logLevel:
+            return
+        if args:
+            msg = msg % args
+        if self.__logQueue is not None:
+            self.__logQueue.put(level, self.__loggerName, msg,
+                                self.__log2file)
+        else:
+            _emit(level, self.__loggerName, _current_process().name,
+                  _current_thread().name, msg, self.__log2file, _time())
+
+    def isEnabledFor(self, level):
+        return self.__logEnable and level >= self.__logLevel
+
+    def critical(self, msg, *args):
+        self.logMessage(msg, self.CRITICAL, *args)
+
+    def error(self, msg, *args):
+        self.logMessage(msg, self.ERROR, *args)
+
+    def warning(self, msg, *args):
+        self.logMessage(msg, self.WARNING, *args)
+
+    def info(self, msg, *args):
+        self.logMessage(msg, self.INFO, *args)
+
+    def debug(self, msg, *args):
+        self.logMessage(msg, self.DEBUG, *args)
 
     def __prepareHandler(self):
         if not len(self.__devlogger.handlers):
@@ -158,14 +215,14 @@ class Logger(object):
             return self.__logLevel
 
         def fset(self, level):
-            if type(level) not in [int, long]:
+            if not isinstance(level, _integers):
                 raise AssertionError("The value must be integer")
             self.__devlogger.setLevel(level)
             if self.__handler is not None:
                 self.__handler.setLevel(level)
             self.__logLevel = level
             for child in self._instances:
-                child.logLevel = value
+                child.logLevel = level
 
         return locals()
 
@@ -101,8 +101,11 @@ class MemoryPercent(_ConditionCheck):
         elif self.warning is not None and\
                 self.__memoryPercentUsage >= self.warning:
             if previous != self.__memoryPercentUsage:
-                self.warning("Memory percentage use at %f"
-                             % (self.__memoryPercentUsage))
+                self._log("Memory percentage use at %f"
+                          % (self.__memoryPercentUsage))
         else:
             self.debug("Memory percentage use at %f"
                        % (self.__memoryPercentUsage))
+
+    def pressure(self):
+        return self._pressure(self.value, self.warning)
@@ -0,0 +1,160 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler as _RequestHandler
+    from BaseHTTPServer import HTTPServer as _HTTPServer
+except ImportError:  # python 3
+    from http.server import BaseHTTPRequestHandler as _RequestHandler
+    from http.server import HTTPServer as _HTTPServer
+import os
+from .stats import BUCKETS as _BUCKETS
+from .stats import bounds as _bounds
+from threading import Thread as _Thread
+
+CONTENTTYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_WORKERMETRICS = [('tasks', 'yamp_tasks_total', 'counter',
+                   "Inputs processed by the worker."),
+                  ('busy', 'yamp_busy_seconds_total', 'counter',
+                   "Seconds used by the target in the worker."),
+                  ('running', 'yamp_running_seconds', 'gauge',
+                   "Seconds the target has been with the current input."),
+                  ('bytesIn', 'yamp_received_bytes_total', 'counter',
+                   "Bytes of the inputs received by the worker."),
+                  ('bytesOut', 'yamp_sent_bytes_total', 'counter',
+                   "Bytes of the outputs sent by the worker.")]
+_HISTOGRAMS = [('wait', 'yamp_wait_seconds',
+                "Seconds the chunks have waited in the input."),
+               ('execution', 'yamp_execution_seconds',
+                "Seconds of each call to the target."),
+               ('transit', 'yamp_transit_seconds',
+                "Seconds the outputs have traveled to the collector.")]
+
+
+def _labels(labels, **extra):
+    pairs = sorted(labels.items()) + sorted(extra.items())
+    if len(pairs) == 0:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (k, v) for k, v in pairs)
+
+
+def _number(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value))
+
+
+def text(stats, histograms, throughput=None, labels=None):
+    """
+        Prometheus text exposition of the stats() of a Pool, its merged
+        histograms (name: histogram) and the last throughput (outputs per
+        second). The labels, if given, are added to all the samples.
+    """
+    labels = labels or {}
+    lines = []
+    for key, name, kind, description in _WORKERMETRICS:
+        lines.append("# HELP %s %s" % (name, description))
+        lines.append("# TYPE %s %s" % (name, kind))
+        for id, worker in enumerate(stats['workers']):
+            lines.append("%s%s %s" % (name, _labels(labels, worker=id),
+                                      _number(worker[key] or 0)))
+    for name, kind, description, value in \
+            [('yamp_collected_total', 'counter', "Outputs collected.",
+              stats['collected']),
+             ('yamp_inputs', 'gauge', "Inputs, once the input is exhausted.",
+              stats['inputs']),
+             ('yamp_elapsed_seconds', 'gauge', "Seconds since the start.",
+              stats['elapsed']),
+             ('yamp_throughput', 'gauge', "Outputs collected per second.",
+              throughput)]:
+        if value is None:
+            continue
+        lines.append("# HELP %s %s" % (name, description))
+        lines.append("# TYPE %s %s" % (name, kind))
+        lines.append("%s%s %s" % (name, _labels(labels), _number(value)))
+    limits = _bounds()
+    for key, name, description in _HISTOGRAMS:
+        histogram = histograms[key]
+        lines.append("# HELP %s %s" % (name, description))
+        lines.append("# TYPE %s histogram" % (name))
+        accumulated = 0
+        for i in range(_BUCKETS):
+            accumulated += histogram[i]
+            lines.append("%s_bucket%s %s"
+                         % (name, _labels(labels, le=_number(limits[i])),
+                            _number(accumulated)))
+        lines.append("%s_sum%s %s" % (name, _labels(labels),
+                                      _number(histogram[_BUCKETS])))
+        lines.append("%s_count%s %s" % (name, _labels(labels),
+                                        _number(accumulated)))
+    return "\n".join(lines) + "\n"
+
+
+def write(fileName, content):
+    """
+        Replace the file with the content at once, so who reads it (like the
+        textfile collector of the node exporter) never sees it half written.
+    """
+    temporary = "%s.%d.tmp" % (fileName, os.getpid())
+    with open(temporary, 'w') as output:
+        output.write(content)
+    os.rename(temporary, fileName)
+
+
+class MetricsServer(object):
+    def __init__(self, producer, port, address='127.0.0.1'):
+        """
+            HTTP server, in a daemon thread, that answers any GET with the
+            text the producer (a callable) returns at that moment.
+
+            Arguments:
+            - producer: callable that returns the text of the metrics.
+            - port: where to listen, 0 for any free one.
+            - address: (optional) where to listen, only locally by default.
+        """
+        class Handler(_RequestHandler):
+            def do_GET(self):
+                body = producer().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENTTYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.__server = _HTTPServer((address, port), Handler)
+        self.__thread = _Thread(target=self.__server.serve_forever)
+        self.__thread.setDaemon(True)
+        self.__thread.start()
+
+    @property
+    def port(self):
+        return self.__server.server_address[1]
+
+    def close(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
@@ -0,0 +1,73 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+from multiprocessing import Lock as _Lock
+from multiprocessing import Pipe as _Pipe
+try:
+    from cPickle import dumps as _dumps
+    from cPickle import loads as _loads
+    from cPickle import HIGHEST_PROTOCOL as _HIGHEST_PROTOCOL
+except ImportError:
+    from pickle import dumps as _dumps
+    from pickle import loads as _loads
+    from pickle import HIGHEST_PROTOCOL as _HIGHEST_PROTOCOL
+try:
+    from Queue import Empty as _Empty
+except ImportError:
+    from queue import Empty as _Empty
+
+
+class PipeQueue(object):
+    def __init__(self):
+        """
+            Many producers, single consumer, queue over a pipe. Unlike the
+            multiprocessing Queue, put() writes in the pipe before returning,
+            without a feeder thread in the producer. So what has been put
+            survives the producer being killed afterwards, and the write lock
+            is never held by a thread that keeps running while the target
+            does. The put() returns the bytes written.
+        """
+        self.__reader, self.__writer = _Pipe(False)
+        self.__writeLock = _Lock()
+
+    def put(self, obj, block=True, timeout=None):
+        data = _dumps(obj, _HIGHEST_PROTOCOL)
+        with self.__writeLock:
+            self.__writer.send_bytes(data)
+        return len(data)
+
+    def put_nowait(self, obj):
+        return self.put(obj, False)
+
+    def get(self, block=True, timeout=None):
+        if not block:
+            timeout = 0
+        if not self.__reader.poll(timeout):
+            raise _Empty
+        return _loads(self.__reader.recv_bytes())
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def empty(self):
+        return not self.__reader.poll()
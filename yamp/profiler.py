@@ -0,0 +1,180 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+from cProfile import Profile as _Profile
+from marshal import dump as _dump
+import pstats as _pstats
+try:
+    from StringIO import StringIO as _StringIO
+except ImportError:  # python 3
+    from io import StringIO as _StringIO
+from signal import ITIMER_PROF as _ITIMER_PROF
+from signal import setitimer as _setitimer
+from signal import SIG_DFL as _SIG_DFL
+from signal import siginterrupt as _siginterrupt
+from signal import signal as _signal
+from signal import SIGPROF as _SIGPROF
+
+
+def codeKey(function):
+    """
+        How a profiler names a python function: (file, line, name), or None
+        when it is not one (like a builtin).
+    """
+    if not hasattr(function, '__code__') and \
+            not hasattr(function, '__func__') and \
+            hasattr(function, '__call__'):
+        function = function.__call__  # a callable object
+    function = getattr(function, '__func__', function)
+    code = getattr(function, '__code__', None)
+    if code is None:
+        return None
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+def build(profile):
+    """
+        Profiler for the profile argument of a Worker: True for cProfile,
+        a number for a Sampler with that interval in seconds.
+    """
+    if profile is True:
+        return _Profile()
+    return Sampler(profile)
+
+
+class Sampler(object):
+    def __init__(self, interval):
+        """
+            Statistical profiler of the process: every interval (seconds) of
+            CPU used, a SIGPROF interrupts the main thread and its stack is
+            counted. So it only sees the CPU, not the waits, but it doesn't
+            change how long the functions take. It has the interface of
+            cProfile used here (enable, disable and dump_stats) and its
+            stats are the ones of pstats, with the samples as calls and
+            their time as the interval times the samples.
+        """
+        self.__interval = interval
+        self.__samples = {}  # key: [own samples, samples in the stack]
+        self.__previous = None
+
+    def enable(self):
+        # raises ValueError out of the main thread
+        self.__previous = _signal(_SIGPROF, self.__sample)
+        _siginterrupt(_SIGPROF, False)  # restart the interrupted calls
+        _setitimer(_ITIMER_PROF, self.__interval, self.__interval)
+
+    def disable(self):
+        _setitimer(_ITIMER_PROF, 0)
+        _signal(_SIGPROF, self.__previous or _SIG_DFL)
+
+    def dump_stats(self, fileName):
+        with open(fileName, 'wb') as output:
+            _dump(self.stats, output)
+
+    @property
+    def stats(self):
+        stats = {}
+        for key, (own, inStack) in self.__samples.items():
+            stats[key] = (inStack, inStack, own*self.__interval,
+                          inStack*self.__interval, {})
+        return stats
+
+    def __sample(self, signum, frame):
+        seen = set()
+        own = True
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_filename, code.co_firstlineno, code.co_name)
+            samples = self.__samples.setdefault(key, [0, 0])
+            if own:
+                samples[0] += 1
+                own = False
+            if key not in seen:  # recursion counts once
+                samples[1] += 1
+                seen.add(key)
+            frame = frame.f_back
+
+
+class Report(object):
+    def __init__(self, fileNames, parts):
+        """
+            Profiles of many workers merged in a single pstats.Stats.
+
+            Arguments:
+            - fileNames: where the workers have dumped their stats.
+            - parts: list of pairs (name, keys of functions) whose
+              cumulative time split the one of the procedure. The first has
+              to be the whole procedure, the one of yamp is what is left.
+              A key that is None (like the one of a builtin) counts nothing.
+        """
+        self.__files = len(fileNames)
+        self.__parts = parts
+        self.__stats = None
+        for fileName in fileNames:
+            try:
+                stats = _pstats.Stats(fileName)
+            except TypeError:  # without any function, like without samples
+                continue
+            if self.__stats is None:
+                self.__stats = stats
+            else:
+                self.__stats.add(stats)
+
+    @property
+    def stats(self):
+        """The pstats.Stats of all the workers, None without profiles."""
+        return self.__stats
+
+    def split(self):
+        """
+            Seconds used by each part (like the target, the hooks or the
+            wait for inputs) and by yamp itself, in all the workers.
+        """
+        stats = {} if self.__stats is None else self.__stats.stats
+        times = {}
+        for name, keys in self.__parts:
+            times[name] = sum(stats[key][3] for key in keys if key in stats)
+        total = self.__parts[0][0]
+        parts = sum(times[name] for name, keys in self.__parts[1:])
+        times['yamp'] = max(0.0, times[total]-parts)
+        return times
+
+    def text(self, n=20):
+        """The split and the n functions with more own time."""
+        split = self.split()
+        total = self.__parts[0][0]
+        lines = ["Profile of %d worker procedures" % (self.__files)]
+        for name in [name for name, keys in self.__parts[1:]] + ['yamp']:
+            share = split[name]/split[total] if split[total] else 0.0
+            lines.append("%12s %12.6f s %6.1f%%" % (name, split[name],
+                                                    share*100))
+        lines.append("%12s %12.6f s" % (total, split[total]))
+        if self.__stats is None:
+            return "\n".join(lines)
+        stream = _StringIO()
+        self.__stats.stream = stream
+        self.__stats.sort_stats('tottime').print_stats(n)
+        return "\n".join(lines) + "\n" + stream.getvalue()
+
+    def __str__(self):
+        return self.text()
@@ -0,0 +1,326 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+from ctypes import addressof as _addressof
+from ctypes import c_char as _char
+from ctypes import c_int as _int
+from ctypes import c_ulonglong as _ulonglong
+from ctypes import memmove as _memmove
+from ctypes import string_at as _string_at
+from multiprocessing import cpu_count as _cpu_count
+from multiprocessing import Event as _Event
+from multiprocessing.sharedctypes import RawArray as _RawArray
+from multiprocessing.sharedctypes import RawValue as _RawValue
+try:
+    from cPickle import dumps as _dumps
+    from cPickle import loads as _loads
+    from cPickle import HIGHEST_PROTOCOL as _HIGHEST_PROTOCOL
+except ImportError:
+    from pickle import dumps as _dumps
+    from pickle import loads as _loads
+    from pickle import HIGHEST_PROTOCOL as _HIGHEST_PROTOCOL
+try:
+    from Queue import Empty as _Empty
+    from Queue import Full as _Full
+except ImportError:
+    from queue import Empty as _Empty
+    from queue import Full as _Full
+from struct import Struct as _Struct
+from time import time as _time
+
+QUEUE = 'queue'
+RING = 'ring'
+
+_CAPACITY = 1 << 20  # bytes per ring
+# checks before going to sleep, useless when the other side needs our core
+_SPINS = 100 if _cpu_count() > 1 else 0
+_WAITSLICE = 0.05  # seconds, safety net for a wake up lost in a race
+_LENGTH = _Struct('<I')
+
+
+class Doorbell(object):
+    """
+        Cheap wake up for a single waiter: the one who makes the condition
+        true only touches the (multiprocessing) Event when the other side has
+        said it is sleeping on it.
+    """
+    def __init__(self):
+        self.__event = _Event()
+        self.__waiting = _RawValue(_int, 0)
+
+    def ring(self):
+        if self.__waiting.value:
+            self.__waiting.value = 0
+            self.__event.set()
+
+    def wait(self, ready, timeout=None):
+        """Block until ready() or the timeout, return the last ready()."""
+        deadline = None if timeout is None else _time()+timeout
+        spins = _SPINS
+        while not ready():
+            if spins > 0:
+                spins -= 1
+                continue
+            self.__event.clear()
+            self.__waiting.value = 1
+            if ready():
+                break
+            slice = _WAITSLICE
+            if deadline is not None:
+                slice = min(slice, deadline-_time())
+                if slice <= 0:
+                    break
+            self.__event.wait(slice)
+        self.__waiting.value = 0
+        return ready()
+
+
+class RingBuffer(object):
+    def __init__(self, capacity=None, dataBell=None, spaceBell=None):
+        """
+            Single producer, single consumer, queue of python objects over a
+            circular buffer in shared memory. Producer and consumer only
+            write their own position counter, so no lock is needed. It is
+            meant to be inherited by forked processes.
+
+            Arguments:
+            - capacity: (optional) size in bytes of the buffer. Each message
+              uses 4 bytes more than its pickle.
+            - dataBell, spaceBell: (optional) Doorbells to wait for data or
+              for space. Those can be shared by many rings when on that side
+              there is only one process.
+        """
+        self.__capacity = capacity or _CAPACITY
+        self.__buffer = _RawArray(_char, self.__capacity)
+        self.__address = _addressof(self.__buffer)
+        self.__head = _RawValue(_ulonglong, 0)  # bytes written
+        self.__tail = _RawValue(_ulonglong, 0)  # bytes read
+        self.__puts = _RawValue(_ulonglong, 0)
+        self.__gets = _RawValue(_ulonglong, 0)
+        self.__dataBell = dataBell or Doorbell()
+        self.__spaceBell = spaceBell or Doorbell()
+
+    def put(self, obj, block=True, timeout=None):
+        data = _dumps(obj, _HIGHEST_PROTOCOL)
+        if not self._hasSpace(len(data)):
+            if not block or not \
+                    self.__spaceBell.wait(lambda: self._hasSpace(len(data)),
+                                          timeout):
+                raise _Full
+        self._push(data)
+        return len(data)
+
+    def put_nowait(self, obj):
+        return self.put(obj, False)
+
+    def get(self, block=True, timeout=None):
+        return self.receive(block, timeout)[0]
+
+    def receive(self, block=True, timeout=None):
+        """As get(), but the pair (object, bytes of its pickle)."""
+        if self.empty():
+            if not block or not \
+                    self.__dataBell.wait(self.__notEmpty, timeout):
+                raise _Empty
+        data = self._pop()
+        return _loads(data), len(data)
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def empty(self):
+        return self.__head.value == self.__tail.value
+
+    def __notEmpty(self):
+        return self.__head.value != self.__tail.value
+
+    def qsize(self):
+        return self.__puts.value - self.__gets.value
+
+    def _hasSpace(self, length):
+        size = _LENGTH.size+length
+        if size > self.__capacity:
+            raise ValueError("A message of %d bytes doesn't fit in a ring "
+                             "of %d" % (size, self.__capacity))
+        used = self.__head.value - self.__tail.value
+        return self.__capacity - used >= size
+
+    def _push(self, data):
+        head = self.__head.value
+        length = len(data)
+        offset = head % self.__capacity
+        if offset+_LENGTH.size+length <= self.__capacity:
+            _LENGTH.pack_into(self.__buffer, offset, length)
+            _memmove(self.__address+offset+_LENGTH.size, data, length)
+        else:
+            self.__write(head, _LENGTH.pack(length)+data)
+        # publish only once the message is complete
+        self.__head.value = head+_LENGTH.size+length
+        self.__puts.value += 1
+        self.__dataBell.ring()
+
+    def _pop(self):
+        tail = self.__tail.value
+        offset = tail % self.__capacity
+        if offset+_LENGTH.size <= self.__capacity:
+            length, = _LENGTH.unpack_from(self.__buffer, offset)
+        else:
+            length, = _LENGTH.unpack(self.__read(tail, _LENGTH.size))
+        offset += _LENGTH.size
+        if offset+length <= self.__capacity:
+            data = _string_at(self.__address+offset, length)
+        else:
+            data = self.__read(tail+_LENGTH.size, length)
+        self.__tail.value = tail+_LENGTH.size+length
+        self.__gets.value += 1
+        self.__spaceBell.ring()
+        return data
+
+    def __write(self, position, data):
+        offset = position % self.__capacity
+        first = min(len(data), self.__capacity-offset)
+        _memmove(self.__address+offset, data, first)
+        if first < len(data):
+            _memmove(self.__address, data[first:], len(data)-first)
+
+    def __read(self, position, length):
+        offset = position % self.__capacity
+        first = min(length, self.__capacity-offset)
+        data = _string_at(self.__address+offset, first)
+        if first < length:
+            data += _string_at(self.__address, length-first)
+        return data
+
+
+class RingSet(object):
+    def __init__(self, n, capacity=None, fanIn=True, depth=None):
+        """
+            Set of n RingBuffers, one per worker, seen as a single queue from
+            the side where there is only one process.
+
+            Arguments:
+            - n: number of rings.
+            - capacity: (optional) size in bytes of each ring.
+            - fanIn: when True, many producers put in their own ring and a
+              single consumer gets from any of them (the outputs). Otherwise
+              a single producer puts in the ring with less messages waiting
+              and each consumer gets from its own (the inputs).
+            - depth: (optional) without fanIn, messages that can wait in each
+              ring. The fewer, the more the consumers that go faster receive.
+              By default only the capacity limits them.
+        """
+        self.__fanIn = fanIn
+        self.__depth = depth
+        shared = Doorbell()
+        self.__rings = []
+        for i in range(n):
+            if fanIn:
+                ring = RingBuffer(capacity, dataBell=shared)
+            else:
+                ring = RingBuffer(capacity, spaceBell=shared)
+            self.__rings.append(ring)
+        self.__bell = shared
+        self.__next = 0
+        self.__enabled = [True]*n
+
+    def enable(self, id, enabled=True):
+        """The producer doesn't put in the rings that are not enabled."""
+        self.__enabled[id] = enabled
+
+    def ring(self, id):
+        return self.__rings[id]
+
+    def put(self, obj, block=True, timeout=None):
+        """
+            Put in the ring with less messages waiting (the one that has
+            drained first), below the depth and with space for it.
+        """
+        if self.__fanIn:
+            raise AssertionError("Producers must put in their own ring")
+        data = _dumps(obj, _HIGHEST_PROTOCOL)
+        self.__rings[0]._hasSpace(len(data))  # raise if it never fits
+        ring = self.__lightest(len(data))
+        if ring is None:
+            if not block or not self.__bell.wait(
+                    lambda: self.__lightest(len(data)) is not None, timeout):
+                raise _Full
+            ring = self.__lightest(len(data))
+        ring._push(data)
+        return len(data)
+
+    def put_nowait(self, obj):
+        return self.put(obj, False)
+
+    def get(self, block=True, timeout=None):
+        """Get from the next ring, in round robin, with something in."""
+        if not self.__fanIn:
+            raise AssertionError("Consumers must get from their own ring")
+        ring = self.__search(lambda r: not r.empty())
+        if ring is None:
+            if not block or not self.__bell.wait(
+                    lambda: not self.empty(), timeout):
+                raise _Empty
+            ring = self.__search(lambda r: not r.empty())
+        return _loads(ring._pop())
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def empty(self):
+        for ring in self.__rings:
+            if not ring.empty():
+                return False
+        return True
+
+    def qsize(self):
+        return sum(ring.qsize() for ring in self.__rings)
+
+    def __search(self, condition):
+        n = len(self.__rings)
+        for i in range(n):
+            j = (self.__next+i) % n
+            if condition(self.__rings[j]):
+                self.__next = (j+1) % n
+                return self.__rings[j]
+        return None
+
+    def __lightest(self, length):
+        """Enabled ring with less messages, below the depth, with space."""
+        n = len(self.__rings)
+        lightest, waiting = None, None
+        for i in range(n):
+            j = (self.__next+i) % n
+            if not self.__enabled[j]:
+                continue
+            size = self.__rings[j].qsize()
+            if self.__depth is not None and size >= self.__depth:
+                continue
+            if (waiting is None or size < waiting) and \
+                    self.__rings[j]._hasSpace(length):
+                lightest, waiting = j, size
+                if size == 0:
+                    break
+        if lightest is None:
+            return None
+        self.__next = (lightest+1) % n  # round robin between equals
+        return self.__rings[lightest]
@@ -0,0 +1,151 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+from ctypes import c_long as _long
+from .logger import Logger as _Logger
+from multiprocessing import Lock as _Lock
+from multiprocessing.sharedctypes import RawArray as _RawArray
+from time import time as _time
+from .worker import EndOfInput as _EndOfInput
+
+QUEUE = 'queue'
+STEALING = 'stealing'
+
+_HEAD = 0
+_TAIL = 1
+
+
+class WorkStealing(_Logger):
+    def __init__(self, tasks, nWorkers, chunksize=1, *args, **kwargs):
+        """
+            Scheduler where the tasks are partitioned, from the beginning, in
+            one deque per worker. A worker takes chunks from the head of its
+            own deque and, when it is empty, steals half of the tail of the
+            busiest of its peers.
+
+            The tasks list is not shared but inherited by the forked workers.
+            Only the limits of the deques live in shared memory, each one
+            with its own lock, so the owner only contends with the thieves.
+
+            Arguments:
+            - tasks: list of argins.
+            - nWorkers: number of deques to build.
+            - chunksize: (optional) maximum number of tasks taken at once.
+        """
+        super(WorkStealing, self).__init__(*args, **kwargs)
+        self.__tasks = tasks
+        self.__nWorkers = nWorkers
+        self.__chunksize = chunksize
+        self.__limits = _RawArray(_long, 2*nWorkers)
+        self.__locks = [_Lock() for i in range(nWorkers)]
+        self.__partition()
+
+    def __partition(self):
+        size, remainder = divmod(len(self.__tasks), self.__nWorkers)
+        head = 0
+        for id in range(self.__nWorkers):
+            tail = head + size + (1 if id < remainder else 0)
+            self.__limits[2*id+_HEAD] = head
+            self.__limits[2*id+_TAIL] = tail
+            head = tail
+        self.debug("%d tasks partitioned in %d deques"
+                   % (len(self.__tasks), self.__nWorkers))
+
+    def queue(self, id):
+        """Queue like object for the worker with this id."""
+        return _WorkerDeque(self, id)
+
+    def qsize(self):
+        return sum(self.__remaining(id) for id in range(self.__nWorkers))
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def chunk(self, idx, length):
+        """The tasks of a chunk already taken, to process them again."""
+        return self.__tasks[idx:idx+length]
+
+    def get(self, id):
+        """
+            Take a chunk, as a tuple (index of the first task, list of tasks,
+            when it is taken), for the worker id. When there is nothing left
+            in any deque, return an EndOfInput.
+        """
+        chunk = self.__pop(id)
+        while chunk is None:
+            if not self.__steal(id):
+                return _EndOfInput()
+            chunk = self.__pop(id)
+        return chunk
+
+    def __remaining(self, id):
+        return self.__limits[2*id+_TAIL] - self.__limits[2*id+_HEAD]
+
+    def __pop(self, id):
+        with self.__locks[id]:
+            head = self.__limits[2*id+_HEAD]
+            tail = self.__limits[2*id+_TAIL]
+            if head >= tail:
+                return None
+            n = min(self.__chunksize, tail-head)
+            self.__limits[2*id+_HEAD] = head+n
+        return (head, self.__tasks[head:head+n], _time())
+
+    def __steal(self, id):
+        while True:
+            # without locks, it is only a hint about who is the busiest
+            candidates = [(self.__remaining(peer), peer)
+                          for peer in range(self.__nWorkers) if peer != id]
+            candidates = [c for c in candidates if c[0] > 0]
+            if len(candidates) == 0:
+                return False
+            victim = max(candidates)[1]
+            with self.__locks[victim]:
+                head = self.__limits[2*victim+_HEAD]
+                tail = self.__limits[2*victim+_TAIL]
+                n = (tail-head+1)//2
+                if n <= 0:
+                    continue  # someone else has been faster
+                self.__limits[2*victim+_TAIL] = tail-n
+            # only the owner refills its own deque, and it is empty now
+            with self.__locks[id]:
+                self.__limits[2*id+_HEAD] = tail-n
+                self.__limits[2*id+_TAIL] = tail
+            self.debug("stolen %d tasks from deque %d", n, victim)
+            return True
+
+
+class _WorkerDeque(object):
+    """Queue like view of a WorkStealing scheduler for one worker."""
+    def __init__(self, scheduler, id):
+        self.__scheduler = scheduler
+        self.__id = id
+
+    def get(self, *args, **kwargs):
+        return self.__scheduler.get(self.__id)
+
+    def empty(self):
+        return self.__scheduler.empty()
+
+    def qsize(self):
+        return self.__scheduler.qsize()
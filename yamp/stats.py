@@ -0,0 +1,134 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+from ctypes import c_double as _double
+from ctypes import sizeof as _sizeof
+from math import frexp as _frexp
+from multiprocessing.sharedctypes import RawArray as _RawArray
+
+# fields in the row of each worker
+TASKS = 0  # argins processed
+BUSY = 1  # seconds used by the target
+STARTED = 2  # when the argin in process was given to the target, 0 if none
+BYTESIN = 3  # bytes of the chunks received, when the transport tells it
+BYTESOUT = 4  # bytes of the outputs sent, when the transport tells it
+_COUNTERS = 5
+# and after them, the histograms of the worker
+BUCKETS = 32  # of each histogram, the last one without upper bound
+_RESOLUTION = 1e-6  # seconds, upper bound of the first bucket
+WAIT = _COUNTERS  # seconds the chunks have waited in the input
+EXECUTION = WAIT+BUCKETS+1  # seconds of each call to the target
+_FIELDS = EXECUTION+BUCKETS+1
+
+
+def bounds():
+    """
+        Upper bound, in seconds, of each bucket of a histogram. They double
+        from one microsecond, so the relative error is bounded at any scale.
+    """
+    return [_RESOLUTION*2**i for i in range(BUCKETS-1)] + [float('inf')]
+
+
+def newHistogram():
+    """Empty histogram: the count of each bucket and the sum of seconds."""
+    return [0.0]*(BUCKETS+1)
+
+
+def histogram(row, kind):
+    """The histogram kind (WAIT or EXECUTION) of a row, sharing memory."""
+    return (_double*(BUCKETS+1)).from_buffer(row, kind*_sizeof(_double))
+
+
+def observe(histogram, seconds):
+    """Count the seconds in their bucket of the histogram."""
+    bucket = 0
+    if seconds > _RESOLUTION:
+        mantissa, bucket = _frexp(seconds/_RESOLUTION)
+        if mantissa == 0.5:  # a power of 2 is the bound of the previous
+            bucket -= 1
+    histogram[min(bucket, BUCKETS-1)] += 1
+    histogram[BUCKETS] += seconds
+
+
+def count(histogram):
+    return int(sum(histogram[:BUCKETS]))
+
+
+def quantile(histogram, q):
+    """
+        Upper bound of the bucket where the quantile q (between 0 and 1) of
+        the observations is, None without observations. When it is in the
+        last bucket, the lower bound of it.
+    """
+    total = sum(histogram[:BUCKETS])
+    if total == 0:
+        return None
+    limits = bounds()
+    accumulated = 0
+    for i in range(BUCKETS):
+        accumulated += histogram[i]
+        if accumulated >= q*total:
+            break
+    if i == BUCKETS-1:
+        return limits[i-1]
+    return limits[i]
+
+
+class Stats(object):
+    def __init__(self, n):
+        """
+            Counters and histograms of n workers in a single contiguous
+            array of doubles in shared memory, one row per worker.
+
+            Each row has a single writer, the worker, that updates it without
+            any lock. Who reads takes a copy of the whole array at once, that
+            is a consistent enough snapshot as each field is written in one
+            aligned store.
+        """
+        self.__n = n
+        self.__array = _RawArray(_double, n*_FIELDS)
+
+    def __len__(self):
+        return self.__n
+
+    def row(self, id):
+        """Array of the fields of the worker id, sharing the memory."""
+        if not 0 <= id < self.__n:
+            raise IndexError("No row for the worker %d" % (id))
+        return (_double*_FIELDS).from_buffer(self.__array,
+                                             id*_FIELDS*_sizeof(_double))
+
+    def snapshot(self):
+        """List with the list of the fields of each worker."""
+        values = self.__array[:]
+        return [values[i:i+_FIELDS]
+                for i in range(0, self.__n*_FIELDS, _FIELDS)]
+
+
+def merge(rows, kind):
+    """Histogram kind of all the rows of a snapshot together."""
+    merged = newHistogram()
+    for row in rows:
+        for i in range(BUCKETS+1):
+            merged[i] += row[kind+i]
+    return merged
@@ -0,0 +1,151 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+try:
+    from cPickle import dumps as _dumps
+    from cPickle import loads as _loads
+except ImportError:
+    from pickle import dumps as _dumps
+    from pickle import loads as _loads
+from traceback import format_exc as _format_exc
+
+
+class Task(object):
+    """
+        Wrapper of an argin with settings of its own, that take precedence
+        over the ones of the Pool. The target receives the argin unwrapped,
+        and it is also the argin in the output pair.
+
+        Arguments:
+        - argin: input for the target.
+        - timeout: (optional) seconds the target can use with this argin.
+    """
+    def __init__(self, argin, timeout=None):
+        self.argin = argin
+        self.timeout = timeout
+
+    def __repr__(self):
+        return "Task(%r, timeout=%s)" % (self.argin, self.timeout)
+
+
+class TaskTimeout(Exception):
+    """
+        Output of an argin whose target has exceeded its timeout (as many
+        times as it has been retried). The worker that was executing it has
+        been killed and replaced.
+    """
+    def __init__(self, argin, timeout):
+        super(TaskTimeout, self).__init__(argin, timeout)
+        self.argin = argin
+        self.timeout = timeout
+
+    def __str__(self):
+        return "%r exceeded its timeout of %s seconds" % (self.argin,
+                                                          self.timeout)
+
+
+class TaskError(Exception):
+    """
+        Output of an argin whose target has raised an exception (in all the
+        attempts the retry policy allows) or that has killed the processes
+        that have tried it. It travels as a record: the type name, message
+        and traceback as strings, and the exception itself only when it can
+        be pickled.
+    """
+    def __init__(self, argin, excType, message, traceback=None,
+                 attempts=1, exception=None):
+        super(TaskError, self).__init__(argin, excType, message, traceback,
+                                        attempts, exception)
+        self.argin = argin
+        self.excType = excType
+        self.message = message
+        self.traceback = traceback
+        self.attempts = attempts
+        self.exception = exception
+
+    @classmethod
+    def fromException(cls, argin, exception, attempts=1):
+        """Record of the exception being handled."""
+        excType = type(exception).__name__
+        message = "%s" % (exception,)
+        traceback = _format_exc()
+        try:
+            _loads(_dumps(exception))
+        except Exception:
+            exception = None
+        return cls(argin, excType, message, traceback, attempts, exception)
+
+    def __str__(self):
+        return "%r failed after %d attempts with %s: %s" \
+            % (self.argin, self.attempts, self.excType, self.message)
+
+
+class RetryPolicy(object):
+    def __init__(self, maxAttempts=1, backoff=0.0, factor=2.0,
+                 maxBackoff=None, retryOn=None):
+        """
+            How many times the target is called with an argin that raises
+            an exception, and how long to wait in between.
+
+            Arguments:
+            - maxAttempts: (optional) calls to the target, the first included.
+              It is also the number of workers that an argin can kill.
+            - backoff: (optional) seconds to wait before the first retry.
+            - factor: (optional) multiplier of the wait for each next retry.
+            - maxBackoff: (optional) upper limit of the wait.
+            - retryOn: (optional) exception class, or tuple of them, that are
+              worth a retry. By default any.
+        """
+        if int(maxAttempts) < 1:
+            raise AssertionError("maxAttempts must be at least 1")
+        self.maxAttempts = int(maxAttempts)
+        self.backoff = float(backoff)
+        self.factor = float(factor)
+        self.maxBackoff = maxBackoff
+        self.retryOn = retryOn
+
+    def __repr__(self):
+        return "RetryPolicy(maxAttempts=%d, backoff=%s, factor=%s)" \
+            % (self.maxAttempts, self.backoff, self.factor)
+
+    def retry(self, exception, attempts):
+        """After this number of attempts, shall the exception be retried."""
+        if attempts >= self.maxAttempts:
+            return False
+        return self.retryOn is None or isinstance(exception, self.retryOn)
+
+    def delay(self, attempts):
+        """Seconds to wait after this number of failed attempts."""
+        delay = self.backoff*self.factor**(attempts-1)
+        if self.maxBackoff is not None:
+            delay = min(delay, self.maxBackoff)
+        return delay
+
+
+def unwrap(argin, timeout=None):
+    """Pair with the argin itself and its timeout (or the given default)."""
+    if isinstance(argin, Task):
+        if argin.timeout is not None:
+            timeout = argin.timeout
+        argin = argin.argin
+    return argin, timeout
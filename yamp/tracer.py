@@ -0,0 +1,177 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+__author__ = "Sergi Blanch-Torne"
+__email__ = "srgblnchtrn@protonmail.ch"
+__copyright__ = "Copyright 2016 Sergi Blanch-Torne"
+__license__ = "GPLv3+"
+__status__ = "development"
+
+from ctypes import c_double as _double
+from ctypes import sizeof as _sizeof
+from json import dump as _dump
+from multiprocessing.sharedctypes import RawArray as _RawArray
+from time import time as _time
+
+CAPACITY = 65536  # events kept per track, the oldest are overwritten
+
+# kinds of the events, with a begin and an end (equal in the instants)
+STARTUP = 0  # the worker waiting for the start event
+RECEIVE = 1  # the worker waiting for an input
+CHUNK = 2  # the worker processing a chunk (argument: its index)
+TASK = 3  # a call to the target (argument: index of the argin)
+SEND = 4  # the worker putting an output
+PAUSE = 5  # the worker in pause, by itself
+PARK = 6  # the worker parked
+COLLECT = 7  # the collector draining outputs (argument: how many)
+SUSPENDED = 8  # the processes of the workers suspended
+START = 9  # instants of the Pool ---
+PAUSED = 10
+RESUMED = 11
+STOP = 12
+RESPAWN = 13  # (argument: worker id)
+KILL = 14  # (argument: worker id)
+_NAMES = ['startup', 'receive', 'chunk', 'task', 'send', 'pause', 'park',
+          'collect', 'suspended', 'start', 'pause', 'resume', 'stop',
+          'respawn', 'kill']
+_ARGUMENTS = {CHUNK: 'index', TASK: 'index', COLLECT: 'outputs',
+              RESPAWN: 'worker', KILL: 'worker'}
+_INSTANTS = [START, PAUSED, RESUMED, STOP, RESPAWN, KILL]
+
+_FIELDS = 4  # kind, begin, end, argument
+
+
+class Track(object):
+    def __init__(self, events, lock=None):
+        """
+            Ring of events of one writer (the procedure of a worker), in
+            the shared memory of a Tracer. The first double counts the
+            events ever recorded, so the oldest are overwritten when it is
+            full.
+
+            Recording an event only appends it to a local list, that is
+            written in the ring with flush() (the worker does it after each
+            output). Who has many writing threads gives a lock, and then each
+            event is written at once.
+        """
+        self.__events = events
+        self.__capacity = (len(events)-1)//_FIELDS
+        self.__lock = lock
+        self.__pending = []
+        if lock is None:
+            self.record = self.__append
+
+    def record(self, kind, begin, end=None, argument=-1):
+        with self.__lock:
+            self.__append(kind, begin, end, argument)
+            self.flush()
+
+    def instant(self, kind, argument=-1):
+        self.record(kind, _time(), None, argument)
+
+    def __append(self, kind, begin, end=None, argument=-1):
+        self.__pending.extend((kind, begin, begin if end is None else end,
+                               argument))
+
+    def flush(self):
+        """Write the events recorded in the ring, all of them together."""
+        pending, self.__pending = self.__pending, []
+        n = int(self.__events[0])
+        count = len(pending)//_FIELDS
+        skipped = max(0, count-self.__capacity)  # would be overwritten
+        pending = pending[skipped*_FIELDS:]
+        position = (n+skipped) % self.__capacity
+        while len(pending) > 0:
+            length = min(len(pending), (self.__capacity-position)*_FIELDS)
+            first = 1+position*_FIELDS
+            self.__events[first:first+length] = pending[:length]
+            pending = pending[length:]
+            position = 0
+        self.__events[0] = n+count  # once the events are complete
+
+
+class Tracer(object):
+    def __init__(self, names, capacity=None):
+        """
+            Recorder of the events of many tracks, one per name, in a single
+            array in shared memory, to be inherited by the forked workers.
+            Each track has a single writer and costs 32 bytes per event of
+            capacity.
+
+            Arguments:
+            - names: of the tracks (like the threads in the timeline).
+            - capacity: (optional) events kept per track.
+        """
+        self.__names = list(names)
+        self.__capacity = capacity or CAPACITY
+        self.__length = 1+self.__capacity*_FIELDS
+        self.__array = _RawArray(_double, len(self.__names)*self.__length)
+        self.__origin = _time()
+
+    def track(self, id, lock=None):
+        if not 0 <= id < len(self.__names):
+            raise IndexError("No track %d" % (id))
+        row = (_double*self.__length).from_buffer(
+            self.__array, id*self.__length*_sizeof(_double))
+        return Track(row, lock)
+
+    def events(self, id):
+        """Events (kind, begin, end, argument) of a track, oldest first."""
+        row = self.__array[id*self.__length:(id+1)*self.__length]
+        n = int(row[0])
+        if n <= self.__capacity:
+            first, n = 0, n
+        else:
+            first, n = n % self.__capacity, self.__capacity
+        events = []
+        for i in range(n):
+            position = 1+((first+i) % self.__capacity)*_FIELDS
+            kind, begin, end, argument = row[position:position+_FIELDS]
+            events.append((int(kind), begin, end, argument))
+        return events
+
+    def chromeTrace(self, process=None):
+        """
+            Dictionary with the events in the Trace Event Format, to be
+            opened with chrome://tracing or Perfetto. Each track is a thread
+            of the process, the times in microseconds since the Tracer was
+            built.
+        """
+        pid = 0
+        trace = [{'name': 'process_name', 'ph': 'M', 'pid': pid,
+                  'args': {'name': process or 'yamp'}}]
+        for tid, name in enumerate(self.__names):
+            trace.append({'name': 'thread_name', 'ph': 'M', 'pid': pid,
+                          'tid': tid, 'args': {'name': name}})
+            for kind, begin, end, argument in self.events(tid):
+                event = {'name': _NAMES[kind], 'pid': pid, 'tid': tid,
+                         'ts': (begin-self.__origin)*1e6}
+                if kind in _INSTANTS:
+                    event['ph'] = 'i'
+                    event['s'] = 'p'  # a line through all the tracks
+                else:
+                    event['ph'] = 'X'
+                    event['dur'] = (end-begin)*1e6
+                if kind in _ARGUMENTS and argument >= 0:
+                    event['args'] = {_ARGUMENTS[kind]: int(argument)}
+                trace.append(event)
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+    def dump(self, fileName, process=None):
+        """Write the chromeTrace() as json in the file."""
+        with open(fileName, 'w') as output:
+            _dump(self.chromeTrace(process), output)
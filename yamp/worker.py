@@ -21,33 +21,117 @@ __copyright__ = "Copyright 2016 Sergi Blanch-Torne"
 __license__ = "GPLv3+"
 __status__ = "development"
 
-from ctypes import c_ulonglong as _ulonglong
-from ctypes import c_float as _float
+from ctypes import c_double as _double
+from ctypes import c_longlong as _longlong
 from datetime import datetime as _datetime
 from datetime import timedelta as _timedelta
+try:
+    from . import aio as _aio  # python >= 3.5
+except (ImportError, SyntaxError):
+    _aio = None
 from .events import EventManager as _EventManager
 from .logger import Logger as _Logger
 from multiprocessing import current_process as _current_process
 from multiprocessing import Event as _Event
 from multiprocessing import Process as _Process
-from multiprocessing import Value as _Value
+from multiprocessing.sharedctypes import RawArray as _RawArray
+from multiprocessing.sharedctypes import RawValue as _RawValue
+from os import getpid as _getpid
+from os import kill as _kill
+from os import path as _path
+try:
+    from os import sysconf as _sysconf
+    _PAGESIZE = _sysconf('SC_PAGE_SIZE')
+except (ImportError, ValueError):
+    _PAGESIZE = None
+try:
+    from cPickle import loads as _loads
+except ImportError:
+    from pickle import loads as _loads
 try:
     import psutil as _psutil  # soft-dependency
 except:
     _psutil = None
-from time import sleep as _sleep
-from threading import Thread as _Thread
+from . import profiler as _profiler
+from signal import SIGKILL as _SIGKILL
+from signal import SIGTERM as _SIGTERM
+from .stats import BUSY as _BUSY
+from .stats import BYTESIN as _BYTESIN
+from .stats import BYTESOUT as _BYTESOUT
+from .stats import EXECUTION as _EXECUTION
+from .stats import histogram as _histogram
+from .stats import observe as _observe
+from .stats import STARTED as _STARTED
+from .stats import Stats as _Stats
+from .stats import TASKS as _TASKS
+from .stats import WAIT as _WAIT
+from .task import RetryPolicy as _RetryPolicy
+from .task import TaskError as _TaskError
+from .task import TaskTimeout as _TaskTimeout
+from .task import unwrap as _unwrap
+from .tracer import CHUNK as _CHUNK
+from .tracer import PARK as _PARK
+from .tracer import PAUSE as _PAUSE
+from .tracer import RECEIVE as _RECEIVE
+from .tracer import SEND as _SEND
+from .tracer import STARTUP as _STARTUP
+from .tracer import TASK as _TASK
 from threading import current_thread as _current_thread
-from traceback import print_exc as _print_exc
+from threading import Thread as _Thread
+from time import sleep as _sleep
+from time import time as _time
+from traceback import format_exc as _format_exc
+try:
+    from Queue import Empty as _Empty
+except ImportError:  # python 3
+    from queue import Empty as _Empty
 
 _MAXJOINTRIES = 3
+_RECEIVEPERIOD = 0.1  # seconds between checks of the stop waiting an input
+_NOTHING = object()  # what is received when the stop comes first
+PROCESSES = 'processes'  # the procedure of each worker in a child process
+THREADS = 'threads'  # the procedure of each worker in a thread
+
+
+def _rss():
+    """Resident memory of the current process in bytes, None if unknown."""
+    if _psutil is not None:
+        return _psutil.Process(_getpid()).memory_info().rss
+    if _PAGESIZE is None:
+        return None
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1])*_PAGESIZE
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+
+
+class EndOfInput(object):
+    """
+        Mark to be put in the input queue of a Worker to tell it that no more
+        elements will come. Queues may be momentarily empty while they are
+        fed, so emptiness is not an end condition.
+    """
+    pass
+
+
+class WorkerEnd(object):
+    """
+        Mark that a Worker puts in its output queue when it finishes, so who
+        is collecting the outputs knows it without having to poll.
+    """
+    def __init__(self, id):
+        self.id = id
 
 
 class Worker(_Logger):
     def __init__(self, id, target, inputQueue, outputQueue, checkPeriod=None,
                  preHook=None, preExtraArgs=None,
-                 postHook=None, postExtraArgs=None,
-                 *args, **kwargs):
+                 postHook=None, postExtraArgs=None, chunksize=None,
+                 maxTasks=None, maxRss=None, timeout=None, retryPolicy=None,
+                 cooperative=False, events=None, backend=None,
+                 concurrency=None, stats=None, trace=None, profile=None,
+                 profileFolder=None, *args, **kwargs):
         """
             Build an object...
 
@@ -57,15 +141,70 @@ class Worker(_Logger):
               executing with the input arguments. It must be callable with
               objects in the argin queue as parameters.
             + inputQueue: multithreading queue where each element is data input
-              for the method that will be executed by the child process.
+              for the method that will be executed by the child process. The
+              end of the input is marked with an EndOfInput instance.
             + outputQueue: multithreading queue where the results will be
-              stored after the execution.
+              stored after the execution. When the worker finishes it puts
+              there a WorkerEnd.
             * {pre, post}Hook: callable objects to be executed before or after
               the target.
             * {pre, post}ExtraArgs: dictionaries that will be passed to hooks.
+            * chunksize: when set, the elements in the input queue are chunks:
+              tuples with the index of its first argin and a list of argins
+              (up to chunksize, whose value may be adapted by the Pool). The
+              output will be, for each chunk, a tuple with the same index and
+              the list of [argin, argout] pairs. Otherwise each element is an
+              argin and each output a pair. A chunk can have a third element,
+              the time when it was put in the input, and then its output has
+              the time when it is put in the output.
+            * maxTasks: number of argins after which the child process
+              retires, to be replaced by a new one.
+            * maxRss: bytes of resident memory of the child process above
+              which it retires. Both limits are checked between chunks.
+            * timeout: seconds each call to the target can use (a Task can
+              have its own). The deadline is published in shared memory, for
+              the owner to kill the process when it has passed. A TaskTimeout
+              in a chunk is put in the output as the argout of its argin,
+              without calling the target.
+            * retryPolicy: RetryPolicy that says how many times the target
+              is called, and the wait in between, when it raises. When it
+              gives up the argout is a TaskError (the same as with a TaskError
+              in a chunk, that isn't called).
+            * cooperative: when set, the pause is also checked between the
+              argins of a chunk, and not only between chunks.
+            * events: EventManager with the start, pause and stop of the
+              owner. By default the worker has its own.
+            * backend: where the procedure runs, 'processes' (default) or
+              'threads'. A thread cannot be suspended nor killed, so it only
+              pauses between tasks and doesn't have deadlines.
+            * concurrency: when the target is a coroutine function, number
+              of argins of a chunk whose coroutines run at the same time in
+              the event loop of the child. Their timeout cancels them.
+            * stats: row of a Stats where the worker counts, without lock,
+              the argins processed, the time in the target and the bytes
+              received and sent, with the histograms of the seconds of each
+              call to the target and of the wait of the chunks. By default
+              the worker has its own.
+            * trace: Track of a Tracer where the procedure records when it
+              waits, receives, processes, calls the target and sends.
+            * profile: run the procedure under cProfile (True) or sample
+              it every this number of seconds. Each child dumps its stats,
+              when it finishes, in the profileFolder (as
+              worker<id>-<generation>.prof).
+
+            The child process is forked when the object is built and waits
+            for the start event. The Worker doesn't watch its process, that
+            is made by who owns it (the Pool supervisor): suspend, resume
+            and join. Alone, a pause takes effect between tasks. The same
+            applies to a retired child: the owner has to _respawn() it. The
+            owner can also _park() the worker, that then doesn't take more
+            inputs until it is _unpark()ed.
         """
         super(Worker, self).__init__(*args, **kwargs)
         self.__id = id
+        self.__backend = backend or PROCESSES
+        if self.__backend not in [PROCESSES, THREADS]:
+            raise AssertionError("Unknown backend %r" % (backend))
         if not callable(target):
             raise AssertionError("Target must be callable object")
         else:
@@ -73,17 +212,42 @@ class Worker(_Logger):
         self.__input = inputQueue
         self.__currentArgin = None
         self.__output = outputQueue
-        self.__ctr = _Value(_ulonglong, 0)
-        self.__computationTime = _Value(_float, 0.0)
+        # only the transports of yamp tell the bytes of what travels
+        self.__sizedInput = hasattr(inputQueue, 'receive')
+        self.__stats = stats if stats is not None else _Stats(1).row(0)
+        self.__waitHistogram = _histogram(self.__stats, _WAIT)
+        self.__executionHistogram = _histogram(self.__stats, _EXECUTION)
+        self.__trace = trace
+        self.__profile = profile
+        self.__profileFolder = profileFolder
+        self.__profiler = None  # built by the child
+        # index, length and position in process of the chunk in the hands
+        # of the child, and when the target has to have finished
+        self.__holding = _RawArray(_longlong, [-1, 0, 0])
+        self.__deadline = _RawValue(_double, 0.0)
         self.__currentArgout = None
+        self.__chunksize = chunksize
+        self.__maxTasks = maxTasks
+        self.__maxRss = maxRss
+        self.__timeout = timeout
+        self.__retryPolicy = retryPolicy or _RetryPolicy()
+        self.__coroutines = _aio is not None and \
+            _aio.isCoroutineFunction(target)
+        self.__concurrency = concurrency
+        self.__runner = None  # event loop, built by the child
+        self.__cooperative = cooperative
         self.__checkPeriod = 60  # seconds
         self.checkPeriod = checkPeriod
         # Events ---
-        self.__events = _EventManager()
+        self.__events = events or _EventManager(*args, **kwargs)
         self.__prepared = _Event()
         self.__prepared.clear()
-        self.__internalEvent = _Event()
-        self.__internalEvent.clear()
+        self.__endOfInput = _Event()
+        self.__endOfInput.clear()
+        self.__retired = _Event()
+        self.__retired.clear()
+        self.__unparked = _Event()
+        self.__unparked.set()
         # Hooks ---
         self.__preHook = None
         self.__preExtraArgs = None
@@ -93,12 +257,11 @@ class Worker(_Logger):
         self.preExtraArgs = preExtraArgs
         self.postHook = postHook
         self.postExtraArgs = postExtraArgs
-        # thread and process ---
-        self.__monitor = _Thread(target=self.__thread)
+        # process ---
         self.__worker = None
-        self.__monitor.setDaemon(True)
-        self.__monitor.start()
         self.__workerPausedFlag = False
+        self.__generation = 0
+        self.__fork()
 
     @property
     def id(self):
@@ -148,160 +311,527 @@ class Worker(_Logger):
 #         self.stop()  # TODO: break the execution
 
     def isAlive(self):
-        """Request to know if the worker is alive."""
-        return self.__monitor.isAlive()
-        # TODO: those condition must be reviewed.
+        """
+        Request to know if the worker is alive. A retired child that is not
+        yet replaced counts as alive.
+        """
+        return self.__isProcessAlive() or self.retired
+
+    @property
+    def retired(self):
+        """The child process has finished to be replaced by a new one."""
+        return self.__retired.is_set()
+
+    def _mustRespawn(self):
+        """The child process has retired and has already finished."""
+        return self.retired and not self.__isProcessAlive()
+
+    def _crashed(self):
+        """
+            The child process has died without finishing its procedure. When
+            it was terminated (as multiprocessing does with the daemonic ones
+            at the exit) it is not a crash to recover from.
+        """
+        return not self.__isProcessAlive() and not self.retired and \
+            self.exitcode not in (None, 0, -_SIGTERM)
+
+    @property
+    def holding(self):
+        """
+        Tuple (index, length, position) of the chunk the child process has
+        taken, and whose outputs are not yet in the output queue, with the
+        position of the argin in process. None when there isn't.
+        """
+        idx, length, position = self.__holding[:]
+        if idx < 0:
+            return None
+        return idx, length, position
+
+    def _expired(self, now=None):
+        """
+            When the target is beyond its deadline, the pair (index, position)
+            of the argin in the chunk. Otherwise None.
+        """
+        deadline = self.__deadline.value
+        if deadline == 0 or (now or _time()) < deadline:
+            return None
+        idx, length, position = self.__holding[:]
+        return idx, position
+
+    @property
+    def deadline(self):
+        """Time when the current call to the target has to end, or None."""
+        return self.__deadline.value or None
+
+    def _park(self):
+        """The child will not take more inputs until it is unparked."""
+        if self.__unparked.is_set():
+            self.debug("Worker %d parked" % (self.__id))
+            self.__unparked.clear()
+
+    def _unpark(self):
+        if not self.__unparked.is_set():
+            self.debug("Worker %d unparked" % (self.__id))
+            self.__unparked.set()
+
+    @property
+    def parked(self):
+        return not self.__unparked.is_set()
+
+    @property
+    def generation(self):
+        """Number of times the child process has been replaced."""
+        return self.__generation
 
     def __isProcessAlive(self):
         return self.__worker is not None and self.__worker.is_alive()
 
-#     def __checkDeadProcess(self):
-#         if not self.__isProcessAlive():
-#             if self._endProcedure():
-#                 self.info("Worker has finish and nothing else to be made.")
-#                 return
-#             self.critical("process has died and it shouldn't!")
-#             self.__input.put(self.__currentArgin)
-#             self.__worker = _Process(target=self.__procedure)
-#             self.__worker.start()
+    @property
+    def sentinel(self):
+        """
+        Object that becomes ready when the child process ends (to be used
+        with multiprocessing.connection.wait), None when not available.
+        """
+        return getattr(self.__worker, 'sentinel', None)
+
+    @property
+    def exitcode(self):
+        if self.__backend == THREADS:
+            # a thread cannot die without finishing its procedure
+            return None if self.__worker.is_alive() else 0
+        return self.__worker.exitcode
+
+    @property
+    def backend(self):
+        return self.__backend
 
     # TODO: progress feature
 
     def _endProcedure(self):
-        return self._procedureHas2End() or self.__input.empty()
+        return self._procedureHas2End() or self.__endOfInput.is_set()
 
     def _procedureHas2End(self):
         """End condition for the process"""
         return self.__events.isStopped()
 
-    # thread and process ---
+    # process ---
 
-    def __thread(self):
-        """Monitor thread function."""
-        _current_thread().name = "Monitor%d" % (self.__id)
-        self.__prepared.set()
+    def __fork(self, recovered=None):
         self.info("Creating the fork")
-        self.__worker = _Process(target=self.__procedure)
-        while not self.__events.waitStart(self.__checkPeriod):
-            self.debug("Waiting to start")
-            # FIXME: msg to be removed, together with the timeout
-        self.info("Starting the fork")
+        # the fork is made now and it waits there for the start event, so
+        # the start doesn't have to wait for any fork
+        if self.__backend == THREADS:
+            self.__worker = _Thread(target=self.__procedure,
+                                    args=(recovered,))
+        else:
+            self.__worker = _Process(target=self.__procedure,
+                                     args=(recovered,))
+        self.__worker.daemon = True  # don't block the exit if never started
         self.__worker.start()
-        self.__processMonitoring()
-        self.info("Monitor has finished its task")
+        self.__prepared.set()
 
-    def __processMonitoring(self):
-        self.debug("Start monitoring")
-        while not self._endProcedure():
+    def _respawn(self, recovered=None):
+        """
+            Replace a child process that has retired, or died, by a new one.
+            A chunk recovered from the previous child is the first that the
+            new one processes, before taking anything from the input.
+        """
+        if self.__isProcessAlive():
+            raise AssertionError("Worker %d still has its process"
+                                 % (self.__id))
+        self._join()
+        self.__generation += 1
+        self.__workerPausedFlag = False
+        self.__endOfInput.clear()  # it may come again, after the lost ones
+        self.__holding[0] = -1
+        self.__deadline.value = 0.0
+        self.__stats[_STARTED] = 0.0
+        # the retired flag is cleared by the new child, so the Worker is
+        # never seen without a process nor it is lost if this one retires
+        # before this method returns
+        self.__fork(recovered)
+        self.info("Worker %d respawned (generation %d)"
+                  % (self.__id, self.__generation))
+
+    def _kill(self, expired=None):
+        """
+            Kill the child process, as it may not answer to anything else.
+            With expired, the (index, position) of _expired(), only if it is
+            still beyond that deadline: the target may have just returned,
+            and the child must not die while it puts the outputs (with the
+            write lock of the output). Return if it has been killed.
+        """
+        if self.__backend == THREADS:
+            self.error("The thread of Worker %d cannot be killed"
+                       % (self.__id))
+        elif self.__isProcessAlive():
+            if expired is not None and self._expired() != expired:
+                self.info("Process %d has finished in time"
+                          % (self.__worker.pid))
+                return False
+            self.warning("Killing process %d" % (self.__worker.pid))
             try:
-                self.__doWait(self.__internalEvent, [[self.__events.waitPause,
-                                                     self.__doPause],
-                                                     [self.__events.waitResume,
-                                                     self.__doResume],
-                                                     ])
-            except Exception as e:
-                self.error("Monitor exception: %s" % (e))
-                _print_exc()
-        self.__doJoin()
-
-    def __doWait(self, primaryEvent, actionsLst):
-        while not primaryEvent.wait(self.__checkPeriod):
-            for event, action in actionsLst:
-                if event(self.__checkPeriod):
-                    action()
-        self.debug("Internal event received")
-
-    def __doPause(self):
-        if _psutil is None:
-            self.warning("Without psutil pause will be when the process "
-                         "finish its current task.")
-        elif self.__worker is not None:
-            if not self.__workerPausedFlag:
-                self.debug("psutil.Process(%d).suspend()"
-                           % (self.__worker.pid))
-                _psutil.Process(self.__worker.pid).suspend()
-                self.__workerPausedFlag = True
-            else:
-                self.debug("Process(%d) already suspended"
-                           % (self.__worker.pid))
-
-    def __doResume(self):
-        if _psutil is not None and self.__worker is not None:
-            if self.__workerPausedFlag:
-                self.debug("psutil.Process(%d).resume()" % (self.__worker.pid))
-                _psutil.Process(self.__worker.pid).resume()
-                self.__workerPausedFlag = False
-            else:
-                self.debug("Process(%d) already resumed" % (self.__worker.pid))
+                _kill(self.__worker.pid, _SIGKILL)
+                return True
+            except OSError as e:
+                self.warning("Cannot kill process %d: %s"
+                             % (self.__worker.pid, e))
+        return False
+
+    def _suspend(self):
+        """Freeze the child process (requires psutil)."""
+        if _psutil is None or self.__backend == THREADS or \
+                not self.__isProcessAlive():
+            return False
+        if not self.__workerPausedFlag:
+            self.debug("psutil.Process(%d).suspend()" % (self.__worker.pid))
+            _psutil.Process(self.__worker.pid).suspend()
+            self.__workerPausedFlag = True
+        else:
+            self.debug("Process(%d) already suspended" % (self.__worker.pid))
+        return True
+
+    def _resume(self):
+        """Continue a child process frozen with _suspend()."""
+        if _psutil is None or self.__backend == THREADS or \
+                not self.__isProcessAlive():
+            return False
+        if self.__workerPausedFlag:
+            self.debug("psutil.Process(%d).resume()" % (self.__worker.pid))
+            _psutil.Process(self.__worker.pid).resume()
+            self.__workerPausedFlag = False
+        else:
+            self.debug("Process(%d) already resumed" % (self.__worker.pid))
+        return True
 
-    def __doJoin(self):
+    def _join(self, timeout=None):
+        """
+            Join the child process. Without timeout, if it doesn't finish
+            after some tries, it is terminated (a thread is abandoned).
+        """
+        if timeout is not None:
+            self.__worker.join(timeout)
+            return not self.__worker.is_alive()
         tries = 0
-        if self.__worker is None:
-            self.debug("No worker to be joined")
-            return
         while self.__worker.is_alive():
             self.__worker.join(self.__checkPeriod)
             if self.__worker.is_alive():
                 tries += 1
                 self.warning("Worker didn't join (try %d)" % (tries))
-                if tries > _MAXJOINTRIES and _psutil is not None:
+                if tries > _MAXJOINTRIES:
+                    if self.__backend == THREADS:
+                        self.error("Worker hasn't finishing, abandoning "
+                                   "its thread")
+                        return False
                     self.error("Worker hasn't finishing, terminating")
-                    _psutil.Process(self.__worker.pid).terminate()
+                    self.__worker.terminate()
         self.debug("Worker %d joined" % (self.__id))
+        return True
 
-    def __procedure(self):
+    def __procedure(self, recovered=None):
         """Function of the fork process"""
-        _current_process().name = "Process%d" % (self.__id)
+        if self.__backend == PROCESSES:
+            _current_process().name = "Process%d" % (self.__id)
         _current_thread().name = "Worker%d" % (self.__id)
-        self.debug("Fork build")
-        while not self.__events.waitStart(self.checkPeriod):
-            self.debug("Waiting start...")
+        self.__retired.clear()
+        self.debug("Fork build, waiting the start")
+        t_0 = _time()
+        self.__events.waitStart()
+        if self.__trace is not None:
+            self.__trace.record(_STARTUP, t_0, _time())
+            self.__trace.flush()
+        if self.__generation == 0:
+            try:
+                self.info("Fork starts %s after the event trigger"
+                          % (_datetime.now()-self.__events.whenStarted()))
+            except Exception as e:
+                self.warning("Start event received but not propagated when "
+                             "it was triggered")
+        if self.__coroutines:
+            self.__runner = _aio.Runner(self.__target, self.__concurrency,
+                                        self.__timeout, self.__retryPolicy,
+                                        self.__preExecute,
+                                        self.__postExecute)
+        if self.__profile and self.__profileFolder is not None:
+            self.__startProfiler()
         try:
-            self.info("Fork starts %s after the event trigger"
-                      % (_datetime.now()-self.__events.whenStarted()))
-        except Exception as e:
-            self.warning("Start event received but not propagated when "
-                         "it was triggered")
+            self.__work(recovered)
+        finally:
+            self.__stopProfiler()
+            if self.__runner is not None:
+                self.__runner.close()
+            if self.__trace is not None:
+                self.__trace.flush()
+
+    def __work(self, recovered):
+        tasks = 0
         while not self._endProcedure():
             try:
                 if self.__events.isPaused():
-                    self.info("paused")
                     if self._procedureHas2End():
                         break
-                    while not self.__events.waitResume(self.checkPeriod):
-                        pass
-                    self.info("resume")
+                    self.__waitResume()
+                elif not self.__unparked.is_set():
+                    self.debug("parked")
+                    t_0 = _time()
+                    while not self.__unparked.wait(self.checkPeriod):
+                        if self._procedureHas2End():
+                            break
+                    if self.__trace is not None:
+                        self.__trace.record(_PARK, t_0, _time())
+                    self.debug("unparked")
+                else:
+                    if recovered is not None:
+                        element, recovered = recovered, None
+                    else:
+                        element = self.__receive()
+                    if element is _NOTHING:
+                        continue  # stopped
+                    if isinstance(element, EndOfInput):
+                        self.debug("end of input received")
+                        self.__endOfInput.set()
+                        break
+                    if self.__chunksize is None:
+                        self.__processElement(element)
+                        tasks += 1
+                    else:
+                        tasks += len(element[1])
+                        self.__processChunk(element)
+                    if self.__mustRetire(tasks):
+                        self.__retired.set()
+                        return
+            except Exception as e:
+                # the ones of the target are already outputs
+                self.error("exception: %s\n%s" % (e, _format_exc()))
+        # process has finish, lets wake up the collector
+        self.__stopProfiler()  # its stats are there before the end
+        self.__output.put(WorkerEnd(self.__id))
+        self.debug("End of the procedure reported")
+
+    def __startProfiler(self):
+        try:
+            self.__profiler = _profiler.build(self.__profile)
+            self.__profiler.enable()
+        except Exception as e:
+            # like when another profiler is active in the process
+            self.warning("Cannot profile: %s" % (e))
+            self.__profiler = None
+
+    def __stopProfiler(self):
+        if self.__profiler is None:
+            return
+        profiler, self.__profiler = self.__profiler, None
+        profiler.disable()
+        fileName = _path.join(self.__profileFolder, "worker%d-%d.prof"
+                              % (self.__id, self.__generation))
+        try:
+            profiler.dump_stats(fileName)
+        except Exception as e:
+            self.error("Cannot write the profile in %s: %s" % (fileName, e))
+
+    def __receive(self):
+        """
+            Next input, or _NOTHING if the Pool is stopped while waiting it
+            (like when the input is a slow generator).
+        """
+        t_0 = _time()
+        while True:
+            try:
+                if not self.__sizedInput:
+                    element = self.__input.get(True, _RECEIVEPERIOD)
                 else:
-                    self.__currentArgin = self.__input.get()
-                    self.debug("argin: %s" % (self.__currentArgin))
-                    if self.__preHook is not None:
-                        self.debug("call preHook")
-                        self.__preHook(self.__currentArgin,
-                                       **self.__preExtraArgs)
+                    element, nbytes = self.__input.receive(True,
+                                                           _RECEIVEPERIOD)
+                    self.__stats[_BYTESIN] += nbytes
+                break
+            except _Empty:
+                if self._procedureHas2End():
+                    return _NOTHING
+        if isinstance(element, bytes):  # pickled by the feeder of the Pool
+            element = _loads(element)
+        if self.__trace is not None:
+            self.__trace.record(_RECEIVE, t_0, _time())
+        return element
+
+    def __send(self, element):
+        t_0 = _time()
+        try:
+            nbytes = self.__output.put(element)
+        except Exception as e:  # it doesn't fit in the ring, or unpicklable
+            self.error("Output sent as errors, as it cannot travel: %s"
+                       % (e))
+            nbytes = self.__output.put(self.__asErrors(element, e))
+        self.__stats[_BYTESOUT] += nbytes or 0
+        if self.__trace is not None:
+            self.__trace.record(_SEND, t_0, _time())
+            self.__trace.flush()  # once per output
+
+    def __asErrors(self, element, exception):
+        """The output element with a TaskError as the argout of each argin."""
+        def errors(pairs):
+            return [[argin, _TaskError(argin, type(exception).__name__,
+                                       "The output cannot travel: %s"
+                                       % (exception))]
+                    for argin, argout in pairs]
+        if isinstance(element, tuple):  # a chunk
+            return (element[0], errors(element[1])) + element[2:]
+        return errors([element])[0]
+
+    def __waitResume(self):
+        self.info("paused")
+        t_0 = _time()
+        try:
+            while not self.__events.waitResume(self.checkPeriod):
+                if self._procedureHas2End():
+                    return
+        finally:
+            if self.__trace is not None:
+                self.__trace.record(_PAUSE, t_0, _time())
+        self.info("resume")
+
+    def __mustRetire(self, tasks):
+        if self.__maxTasks is not None and tasks >= self.__maxTasks:
+            self.info("retires after %d tasks" % (tasks))
+            return True
+        if self.__maxRss is not None:
+            rss = _rss()
+            if rss is not None and rss > self.__maxRss:
+                self.info("retires with %d bytes resident after %d tasks"
+                          % (rss, tasks))
+                return True
+        return False
+
+    def __processElement(self, argin):
+        """Process one single argin and put the pair in the output queue."""
+        if self.__runner is not None:
+            self.__stats[_STARTED] = _time()
+            pairs, times = self.__runner.run([argin])
+            self.__stats[_STARTED] = 0.0
+            self.__stats[_BUSY] += times[0]
+            self.__stats[_TASKS] += 1
+            _observe(self.__executionHistogram, times[0])
+            self.__send(pairs[0])
+            return
+        argin, argout, t_diff = self.__attempt(argin)
+        self.__stats[_BUSY] += t_diff
+        self.__stats[_TASKS] += 1
+        self.__send([argin, argout])
+        self.__postExecute(argin, argout)
+
+    def __processChunk(self, chunk):
+        """
+            Process a list of argins, one by one, and put in the output queue
+            all the pairs at once, with the index of the first of them.
+        """
+        idx, argins = chunk[0], chunk[1]
+        fed = chunk[2] if len(chunk) > 2 else None
+        t_0 = _time()
+        if fed is not None:
+            # what was fed before the start didn't wait for this worker
+            _observe(self.__waitHistogram,
+                     t_0-max(fed, self.__events.startTime))
+        self.debug("chunk %d with %d elements", idx, len(argins))
+        self.__holding[1] = len(argins)
+        self.__holding[2] = 0
+        self.__holding[0] = idx
+        pairs = []
+        t_chunk = 0.0
+        try:
+            if self.__runner is not None:
+                self.__stats[_STARTED] = _time()
+                pairs, times = self.__runner.run(argins)
+                self.__stats[_STARTED] = 0.0
+                t_chunk = sum(times)
+                for t_diff in times:
+                    _observe(self.__executionHistogram, t_diff)
+            else:
+                for position, argin in enumerate(argins):
                     if self._procedureHas2End():
                         break
-                    t_0 = _datetime.now()
-                    self.__currentArgout = self.__target(self.__currentArgin)
-                    t_diff = _datetime.now()-t_0
-                    t_diff = t_diff.total_seconds()
-                    self.__computationTime.value += t_diff
-                    self.debug("argout: %s (%f seconds)"
-                               % (self.__currentArgout, t_diff))
-                    self.__ctr.value += 1
-                    self.__output.put([self.__currentArgin,
-                                       self.__currentArgout])
-                    if self.__postHook is not None:
-                        self.debug("call postHook")
-                        self.__postHook(self.__currentArgin,
-                                        self.__currentArgout,
-                                        **self.__postExtraArgs)
-                    self.__events.step()
+                    if isinstance(argin, (_TaskTimeout, _TaskError)):
+                        # it has already killed previous processes
+                        pairs.append([argin.argin, argin])
+                        continue
+                    if self.__cooperative and self.__events.isPaused():
+                        self.__waitResume()
+                        if self._procedureHas2End():
+                            break
+                    self.__holding[2] = position
+                    argin, argout, t_diff = self.__attempt(argin)
+                    t_chunk += t_diff
+                    pairs.append([argin, argout])
+                    self.__postExecute(argin, argout)
+        finally:
+            self.__stats[_BUSY] += t_chunk
+            self.__stats[_TASKS] += len(pairs)
+            if self.__trace is not None:
+                self.__trace.record(_CHUNK, t_0, _time(), idx)
+            if fed is None:
+                self.__send((idx, pairs))
+            else:
+                self.__send((idx, pairs, _time()))
+            self.__holding[0] = -1
+
+    def __attempt(self, argin):
+        """
+            Execute the argin as many times as the retry policy allows while
+            it raises. Then the argout is a TaskError.
+        """
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                return self.__execute(argin)
             except Exception as e:
-                self.error("exception: %s" % (e))
-                _print_exc()
-        # process has finish, lets wake up the monitor
-        self.__internalEvent.set()
-        self.debug("Internal event emitted to report end of the procedure")
+                unwrapped, timeout = _unwrap(argin)
+                if self.__retryPolicy.retry(e, attempts) and \
+                        not self._procedureHas2End():
+                    delay = self.__retryPolicy.delay(attempts)
+                    self.warning("%r raised %s: %s (attempt %d), retry in "
+                                 "%g seconds" % (unwrapped, type(e).__name__,
+                                                 e, attempts, delay))
+                    _sleep(delay)
+                    continue
+                error = _TaskError.fromException(unwrapped, e, attempts)
+                self.error("%s\n%s" % (error, error.traceback))
+                return unwrapped, error, 0.0
+
+    def __execute(self, argin):
+        argin, timeout = _unwrap(argin, self.__timeout)
+        self.__currentArgin = argin
+        self.debug("argin: %s", self.__currentArgin)
+        self.__preExecute(self.__currentArgin)
+        t_0 = _time()
+        self.__stats[_STARTED] = t_0
+        if timeout is not None:
+            self.__deadline.value = t_0+timeout
+        try:
+            self.__currentArgout = self.__target(self.__currentArgin)
+        finally:
+            self.__deadline.value = 0.0
+            self.__stats[_STARTED] = 0.0
+            if self.__trace is not None:
+                self.__trace.record(_TASK, t_0, _time(),
+                                    self.__holding[0]+self.__holding[2])
+        t_diff = _time()-t_0
+        _observe(self.__executionHistogram, t_diff)
+        self.debug("argout: %s (%f seconds)", self.__currentArgout, t_diff)
+        return self.__currentArgin, self.__currentArgout, t_diff
+
+    def __preExecute(self, argin):
+        if self.__preHook is not None:
+            self.debug("call preHook")
+            self.__preHook(argin, **(self.__preExtraArgs or {}))
+
+    def __postExecute(self, argin, argout):
+        if self.__postHook is not None and not isinstance(argout, _TaskError):
+            self.debug("call postHook")
+            try:
+                self.__postHook(argin, argout,
+                                **(self.__postExtraArgs or {}))
+            except Exception as e:
+                self.error("postHook with %r: %s\n%s"
+                           % (argin, e, _format_exc()))
 
     # properties ---
 
@@ -408,17 +938,39 @@ class Worker(_Logger):
         doc = """Process ID of the worker's child process"""
 
         def fget(self):
+            if self.__backend == THREADS:
+                return _getpid()
             return self.__worker.pid
 
         return locals()
 
     pid = property(**pid())
 
+    def profileParts():
+        doc = """
+        List of (name, keys) of the functions that split the time of the
+        procedure in a profile, the first the whole procedure.
+              """
+
+        def fget(self):
+            key = _profiler.codeKey
+            return [('total', [key(Worker.__work)]),
+                    ('target', [key(self.__target)]),
+                    ('hooks', [key(Worker.__preExecute),
+                               key(Worker.__postExecute)]),
+                    ('receive', [key(Worker.__receive)]),
+                    ('send', [key(Worker.__send)]),
+                    ('pause', [key(Worker.__waitResume)])]
+
+        return locals()
+
+    profileParts = property(**profileParts())
+
     def contribution():
         doc = """Report how many inputs has been processes by this worker"""
 
         def fget(self):
-            return self.__ctr.value
+            return int(self.__stats[_TASKS])
 
         return locals()
 
@@ -430,7 +982,7 @@ class Worker(_Logger):
         """
 
         def fget(self):
-            return self.__computationTime.value
+            return self.__stats[_BUSY]
 
         return locals()
 
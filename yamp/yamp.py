@@ -21,64 +21,318 @@ __copyright__ = "Copyright 2016 Sergi Blanch-Torne"
 __license__ = "GPLv3+"
 __status__ = "development"
 
+try:
+    from . import aio as _aio  # python >= 3.5
+except (ImportError, SyntaxError):
+    _aio = None
+from collections import deque as _deque
 from datetime import datetime as _datetime
 from datetime import timedelta as _timedelta
+from .chunksize import Chunksize as _Chunksize
+from .conditioncheck import PRESSED as _PRESSED
+from .conditioncheck import RELIEVED as _RELIEVED
+from .conditioncheck import STEADY as _STEADY
+from .elastic import Elastic as _Elastic
+from glob import glob as _glob
+from .events import COOPERATIVE as _COOPERATIVE
 from .events import EventManager as _EventManager
+from .events import SUSPEND as _SUSPEND
 from .loadaverage import LoadAverage as _LoadAverage
 from .logger import Logger as _Logger
 from .memorypercent import MemoryPercent as _MemoryPercent
+from . import metrics as _metrics
+from os import path as _path
+from .pipequeue import PipeQueue as _PipeQueue
+from . import profiler as _profiler
+from .ringbuffer import QUEUE as _QUEUETRANSPORT
+from .ringbuffer import RING as _RING
+from .ringbuffer import RingSet as _RingSet
+from .scheduler import QUEUE as _QUEUE
+from .scheduler import STEALING as _STEALING
+from .scheduler import WorkStealing as _WorkStealing
+from .stats import BUSY as _BUSY
+from .stats import BYTESIN as _BYTESIN
+from .stats import BYTESOUT as _BYTESOUT
+from .stats import count as _count
+from .stats import EXECUTION as _EXECUTION
+from .stats import merge as _merge
+from .stats import newHistogram as _newHistogram
+from .stats import observe as _observe
+from .stats import quantile as _quantile
+from .stats import STARTED as _STARTED
+from .stats import Stats as _Stats
+from .stats import TASKS as _TASKS
+from .stats import WAIT as _WAIT
+from .task import TaskError as _TaskError
+from .task import TaskTimeout as _TaskTimeout
+from .task import unwrap as _unwrap
+from . import tracer as _tracer
 from multiprocessing import cpu_count as _cpu_count
 from multiprocessing import Event as _Event
 from multiprocessing import Queue as _Queue
+from shutil import rmtree as _rmtree
+from tempfile import mkdtemp as _mkdtemp
+try:
+    from multiprocessing.connection import wait as _wait
+except ImportError:  # python 2
+    _wait = None
+try:
+    from cPickle import dumps as _dumps
+    from cPickle import HIGHEST_PROTOCOL as _HIGHEST_PROTOCOL
+except ImportError:
+    from pickle import dumps as _dumps
+    from pickle import HIGHEST_PROTOCOL as _HIGHEST_PROTOCOL
+try:
+    from Queue import Empty as _Empty
+    from Queue import Full as _Full
+    from Queue import Queue as _LocalQueue
+except ImportError:
+    from queue import Empty as _Empty
+    from queue import Full as _Full
+    from queue import Queue as _LocalQueue
+from sys import version_info as _version_info
 from threading import current_thread as _current_thread
+from threading import Event as _LocalEvent
+from threading import Lock as _Lock
 from threading import Thread as _Thread
-from time import sleep as _sleep
-from version import version as _version
+from time import time as _time
+from .version import version as _version
+from .worker import EndOfInput as _EndOfInput
+from .worker import PROCESSES as _PROCESSES
+from .worker import THREADS as _THREADS
 from .worker import Worker as _Worker
+from .worker import WorkerEnd as _WorkerEnd
+
+_HIGHWATERMARK = 1000  # chunks waiting in the input queue
+_AUTOHIGHWATERMARK = 4  # chunks per worker when their size is adapted
+_RINGHIGHWATERMARK = 2  # chunks waiting in the ring of each worker
+_ENDOFRESULTS = None  # mark in the local queue of streamed results
+_REVIEWPERIOD = 1.0  # seconds between reviews of the conditions
+_POLLPERIOD = 0.1  # seconds between checks of the workers without wait()
+_MAXCRASHES = 3  # times an argin is retried after killing its worker
+_DEADLINEPERIOD = 0.1  # seconds between checks of the deadlines of targets
+_THROUGHPUTSAMPLES = 3600  # reviews whose outputs collected are kept
 
 
 class Pool(_Logger):
     def __init__(self, target, arginLst, parallel=None, checkPeriod=None,
                  preHook=None, preExtraArgs=None,
-                 postHook=None, postExtraArgs=None,
-                 *args, **kwargs):
+                 postHook=None, postExtraArgs=None, highWaterMark=None,
+                 chunksize=1, chunkTime=None, scheduler=None,
+                 transport=None, ringSize=None, maxTasks=None, maxRss=None,
+                 timeout=None, timeoutRetries=0, retryPolicy=None,
+                 elastic=False, minParallel=1, dwell=None, pauseMode=None,
+                 loadAverage=None, memoryPercent=None, backend=None,
+                 concurrency=None, trace=None, profile=None, *args, **kwargs):
         """
             Build an object with the capacity to execute multiple process with
             the same method. It will build a pool of processes where they will
-            take elements in a shared queue until the queue is empty.
+            take elements in a shared queue until the input is exhausted.
 
             Arguments:
             - target: Method that each of the parallel process will be
               executing with the input arguments. It must be callable with
               objects in the list as parameters.
-            - arginLst: python list where each element is data input for the
-              method that will be executed in parallel.
+            - arginLst: iterable (a list, but also an iterator or a
+              generator) where each element is data input for the method that
+              will be executed in parallel. It is consumed on demand by a
+              feeder thread.
             - parallel: (optional) to establish the number of parallel
               processes that will participate. By default the maximum possible
               based on the number of cores available.
+            - highWaterMark: (optional) maximum number of chunks waiting in
+              the input queue. The feeder blocks when it is reached, so the
+              memory used doesn't depend on the length of the input. With
+              the ring transport it is split between the rings of the
+              workers (by default 2 chunks each), and each chunk goes to the
+              one with less waiting.
+            - chunksize: (optional) number of input elements that travel
+              together to a worker, and whose results come back together.
+              Bigger chunks reduce the per element overhead of the queues when
+              the target is fast. The target is still called per element.
+              With 'auto' the size is adapted from the time the workers
+              report to use per element.
+            - chunkTime: (optional) with an 'auto' chunksize, pair (low, high)
+              of seconds that each chunk should take to be computed.
+            - scheduler: (optional) how the inputs reach the workers. With
+              'queue' (default) all of them take from a single shared queue.
+              With 'stealing' the input is partitioned, from the beginning, in
+              one deque per worker and the ones that finish their part steal
+              from the busiest. It requires a finite input and a fixed
+              chunksize, but the workers barely contend between them.
+            - transport: (optional) how the inputs and outputs travel. With
+              'queue' (default) using multiprocessing queues. With 'ring'
+              using one single producer single consumer ring buffer in
+              shared memory per worker and direction, which avoids the
+              feeder thread and the pipe of the queues.
+            - ringSize: (optional) bytes of each ring. A chunk, or its
+              results, pickled must fit in it.
+            - maxTasks: (optional) number of inputs after which the process
+              of a worker is replaced by a new one.
+            - maxRss: (optional) bytes of resident memory above which the
+              process of a worker is replaced by a new one. Useful when the
+              target leaks memory.
+            - timeout: (optional) seconds that the target can use with each
+              argin (a Task can have its own). The process that exceeds it
+              is killed and replaced.
+            - timeoutRetries: (optional) times that an argin exceeding its
+              timeout is given again before its output is a TaskTimeout.
+            - retryPolicy: (optional) RetryPolicy for the argins whose target
+              raises, their output is a TaskError when it gives up. Its
+              maxAttempts also limits the workers an argin can kill (3 by
+              default), before its output is a TaskError too.
+            - elastic: (optional) when the load average or the memory use are
+              over their warning, park one more worker (it doesn't take
+              inputs), and when they are relieved, unpark one, instead of
+              waiting the limit to pause the whole Pool.
+            - minParallel: (optional) with elastic, workers never parked.
+            - dwell: (optional) with elastic, seconds between changes in the
+              number of active workers.
+            - pauseMode: (optional) how a pause takes effect. With 'suspend'
+              (default) the processes are frozen (with psutil, otherwise
+              between chunks). With 'cooperative' each worker stops by
+              itself between argins, so it never freezes in the middle of a
+              put or a get, and pause and resume take milliseconds.
+            - loadAverage, memoryPercent: (optional) the conditions of
+              another Pool (its properties with the same names), to share
+              them: when the limit is reached all the Pools they govern are
+              paused. By default each Pool has its own.
+            - backend: (optional) where the workers run. With 'processes'
+              (default) each one in a child process. With 'threads' each
+              one in a thread of this process, with local queues: nothing
+              is pickled and hundreds of them cost little memory, but the
+              target must release the GIL (waiting IO) to gain something.
+              The threads cannot be killed nor suspended, so they pause
+              cooperatively and don't accept a timeout, a maxRss or the
+              ring transport.
+            - concurrency: (optional) when the target is a coroutine
+              function (async def), each worker runs an event loop where up
+              to this number of coroutines (100 by default) are in flight.
+              Then the chunksize, if it is not given, is the concurrency.
+              The timeout cancels the coroutine instead of killing the
+              process, and its argout is a TaskTimeout at once.
+            - trace: (optional) when True, or the name of a file, each worker
+              records in shared memory when it waits, receives, processes,
+              calls the target, sends and pauses, and the Pool its start,
+              pause, resume, stop, respawns and drains of outputs. Then
+              dumpTrace() writes a Chrome trace, and with a file name it is
+              written there when the Pool finishes.
+            - profile: (optional) with True each worker runs under cProfile,
+              with a number of seconds it is sampled with this interval of
+              CPU (only in the processes backend). The threads backend
+              cannot profile since python 3.12 (one profiler per process).
+              When the Pool finishes their stats are merged in profile(),
+              that tells the time of the target, the hooks, the wait for
+              inputs, the sends and the pauses apart from the one of yamp.
+              The profile of a worker that dies is lost.
         """
         super(Pool, self).__init__(*args, **kwargs)
         # prepare the parameters ---
         self.__target = target
-        self.__checkPeriod = 60  # seconds
+        self.__checkPeriod = checkPeriod or 60  # seconds
         self.__parallel = None
         self.__workersLst = []
-        self.__input = _Queue()
-        self.__inputNelements = 0
-        self.__output = _Queue()
+        self.__stats = None
+        self.__transit = _newHistogram()  # only written by the collector
+        self.__throughput = _deque(maxlen=_THROUGHPUTSAMPLES)
+        self.__traceFile = trace if isinstance(trace, str) else None
+        self.__tracer = None
+        self.__trace = None  # track of the Pool
+        self.__profile = profile
+        self.__profileFolder = None
+        self.__profileReport = None
+        self.__profiled = _LocalEvent()  # set once they are merged
+        self.__coroutines = _aio is not None and \
+            _aio.isCoroutineFunction(target)
+        self.__concurrency = concurrency
+        if self.__coroutines and chunksize == 1:
+            # the coroutines in flight are the ones of a chunk
+            chunksize = concurrency or _aio.CONCURRENCY
+        self.__chunksize = _Chunksize(chunksize, chunkTime, *args, **kwargs)
+        self._instances.append(self.__chunksize)
+        self.__highWaterMark = highWaterMark
+        self.__scheduler = scheduler or _QUEUE
+        if self.__scheduler not in [_QUEUE, _STEALING]:
+            raise AssertionError("Unknown scheduler %r" % (scheduler))
+        if self.__scheduler == _STEALING and self.__chunksize.auto:
+            raise AssertionError("The stealing scheduler needs a fixed "
+                                 "chunksize")
+        self.__transport = transport or _QUEUETRANSPORT
+        if self.__transport not in [_QUEUETRANSPORT, _RING]:
+            raise AssertionError("Unknown transport %r" % (transport))
+        self.__ringSize = ringSize
+        self.__backend = backend or _PROCESSES
+        if self.__backend not in [_PROCESSES, _THREADS]:
+            raise AssertionError("Unknown backend %r" % (backend))
+        if self.__backend == _THREADS:
+            self.__pauseMode = pauseMode or _COOPERATIVE
+            if self.__pauseMode != _COOPERATIVE or \
+                    self.__transport != _QUEUETRANSPORT or \
+                    maxRss is not None or \
+                    (timeout is not None and not self.__coroutines):
+                raise AssertionError("The threads backend cannot have a "
+                                     "suspend pauseMode, the ring transport,"
+                                     " a timeout nor a maxRss")
+            if profile and profile is not True:
+                raise AssertionError("The threads backend can only profile "
+                                     "with cProfile (profile=True)")
+            if profile and _version_info >= (3, 12):
+                # cProfile uses sys.monitoring, one profiler per process
+                raise AssertionError("The threads backend cannot profile "
+                                     "each worker since python 3.12")
+        else:
+            self.__pauseMode = pauseMode or _SUSPEND
+        if self.__pauseMode not in [_SUSPEND, _COOPERATIVE]:
+            raise AssertionError("Unknown pauseMode %r" % (pauseMode))
+        self.__maxTasks = maxTasks
+        self.__maxRss = maxRss
+        self.__timeout = timeout
+        self.__timeoutRetries = timeoutRetries
+        self.__retryPolicy = retryPolicy
+        if retryPolicy is None:
+            self.__maxCrashes = _MAXCRASHES
+        else:
+            self.__maxCrashes = retryPolicy.maxAttempts-1
+        self.__expired = {}  # worker id: (chunk index, position) killed
+        self.__timeouts = {}  # (chunk index, position): times expired
+        self.__input = None
+        self.__pickledInput = False  # the feeder puts the chunks pickled
+        self.__inputNelements = None  # unknown until input is exhausted
+        self.__inputFed = 0
+        self.__feeder = None
+        self.__output = None
         self.__poolMonitor = _Thread(target=self.__poolMonitorThread)
         self.__poolMonitor.setDaemon(True)
+        self.__supervisor = _Thread(target=self.__supervisorThread)
+        self.__supervisor.setDaemon(True)
         self.__collected = []
-        self.__loadAverage = _LoadAverage(*args, **kwargs)
-        self._instances.append(self.__loadAverage)
-        self.__memoryPercent = _MemoryPercent(*args, **kwargs)
-        self._instances.append(self.__memoryPercent)
-        self.__events = _EventManager()
-        self.__events.loggingFolder = self.loggingFolder
-        self.__events.loggerName = self.loggerName
-        self.__events.logLevel = self.logLevel
-        self.__events.logEnable = self.logEnable
+        self.__nCollected = 0
+        # chunks fed and not yet collected, to recover them if their worker
+        # dies (with the stealing scheduler, the collected ones)
+        self.__inFlight = {}
+        self.__collectedIdx = set()
+        self.__inFlightLock = _Lock()
+        self.__crashes = {}  # (chunk index, position): workers killed
+        self.__losses = {}  # chunk index: times lost by a worker
+        self.__results = None  # local queue when the outputs are streamed
+        self.__abandoned = False  # nobody consumes the streamed outputs
+        self.__failure = None  # what has stopped the Pool before its end
+        self.__workersEnded = set()
+        self.__respawning = set()  # ids the collector has asked to respawn
+        self.__lastReview = 0
+        if loadAverage is None:
+            loadAverage = _LoadAverage(*args, **kwargs)
+            self._instances.append(loadAverage)
+        self.__loadAverage = loadAverage
+        if memoryPercent is None:
+            memoryPercent = _MemoryPercent(*args, **kwargs)
+            self._instances.append(memoryPercent)
+        self.__memoryPercent = memoryPercent
+        self.__elastic = None
+        self.__events = _EventManager(*args, **kwargs)
         self._instances.append(self.__events)
+        self.__loadAverage._govern(self.__events)
+        self.__memoryPercent._govern(self.__events)
         # hooks ---
         self.__preHook = preHook
         self.__preExtraArgs = preExtraArgs
@@ -86,8 +340,18 @@ class Pool(_Logger):
         self.__postExtraArgs = postExtraArgs
         # setup ---
         self.__prepareParallel(parallel)
-        self.__prepareInputQueue(arginLst)
+        if trace:
+            self.__prepareTracer()
+        if profile:
+            self.__profileFolder = _mkdtemp(prefix="yamp-profile-")
+        if elastic:
+            self.__elastic = _Elastic(self.__parallel, minParallel, dwell,
+                                      *args, **kwargs)
+            self._instances.append(self.__elastic)
+        self.__prepareQueues(arginLst, *args, **kwargs)
         self.__prepareWorkers(*args, **kwargs)
+        if self.__scheduler == _QUEUE:
+            self.__prepareInputQueue(arginLst)
         self.__prepareMonitoring()
         self.debug("Prepared a yamp.Pool() version %s" % (_version()))
 
@@ -95,10 +359,12 @@ class Pool(_Logger):
 
     def start(self):
         self.info("START has been requested to the Pool")
+        self.__instant(_tracer.START)
         self.__events.start()
 
     def pause(self):
         self.info("PAUSE has been requested to the Pool")
+        self.__instant(_tracer.PAUSED)
         self.__events.pause()
 
     def isPaused(self):
@@ -109,14 +375,51 @@ class Pool(_Logger):
 
     def resume(self):
         self.info("RESUME has been requested to the Pool")
+        self.__instant(_tracer.RESUMED)
         self.__events.resume()
 
     def stop(self):
         self.info("STOP has been requested to the Pool")
+        self.__instant(_tracer.STOP)
+        if self.__feeder is not None and self.__inputNelements is None and \
+                self.__transport == _QUEUETRANSPORT and \
+                self.__backend == _PROCESSES:
+            # nobody will take what is left, don't wait it at exit
+            self.__input.cancel_join_thread()
+        # a parked worker would only see the stop in its next checkPeriod
+        for worker in self.__workersLst:
+            worker._unpark()
         self.__events.stop()
 
     def isAlive(self):
-        return self.__poolMonitor.isAlive()
+        return self.__poolMonitor.is_alive()
+
+    def profile(self):
+        """
+            Report with the profiles of the workers merged (its stats are a
+            pstats.Stats, split() the seconds by parts and str() a summary).
+            It waits until the Pool finishes and they are merged.
+        """
+        if self.__profileFolder is None:
+            raise AssertionError("The Pool has not been built with profile")
+        self.__profiled.wait()
+        return self.__profileReport
+
+    def __mergeProfiles(self):
+        fileNames = sorted(_glob(_path.join(self.__profileFolder, "*.prof")))
+        return _profiler.Report(fileNames, self.__workersLst[0].profileParts)
+
+    def dumpTrace(self, fileName):
+        """
+            Write what has been recorded with trace in a json file, in the
+            Chrome trace format (chrome://tracing, ui.perfetto.dev): one
+            thread per worker and one for the Pool.
+        """
+        if self.__tracer is None:
+            raise AssertionError("The Pool has not been built with trace")
+        self.__tracer.dump(fileName, "yamp.Pool(%s)"
+                           % (getattr(self.__target, '__name__',
+                                      self.__target)))
 
     def is_alive(self):
         return self.isAlive()
@@ -124,6 +427,47 @@ class Pool(_Logger):
     def waitUntilFinish(self):
         return self.__events.waitStop()
 
+    def imap_unordered(self):
+        """
+            Start the Pool and yield the [argin, argout] pairs as they are
+            collected. Those are not accumulated in the output.
+        """
+        for idx, pairs in self.__stream():
+            for pair in pairs:
+                yield pair
+
+    def imap(self):
+        """
+            Start the Pool and yield the [argin, argout] pairs in the order
+            of the input. Only the outputs that arrive before their turn are
+            retained. Those are not accumulated in the output.
+        """
+        pending = {}
+        nextIdx = 0
+        for idx, pairs in self.__stream():
+            pending[idx] = pairs
+            while nextIdx in pending:
+                pairs = pending.pop(nextIdx)
+                for pair in pairs:
+                    yield pair
+                nextIdx += len(pairs)
+        # only when some chunk has come back incomplete
+        for idx in sorted(pending.keys()):
+            for pair in pending.pop(idx):
+                yield pair
+
+    def aimap_unordered(self):
+        """imap_unordered() to be consumed with 'async for'."""
+        if _aio is None:
+            raise AssertionError("asyncio is not available")
+        return _aio.AsyncIterator(self.imap_unordered())
+
+    def aimap(self):
+        """imap() to be consumed with 'async for'."""
+        if _aio is None:
+            raise AssertionError("asyncio is not available")
+        return _aio.AsyncIterator(self.imap())
+
     # properties
 
     @property
@@ -155,18 +499,57 @@ class Pool(_Logger):
 
     activeWorkers = property(**activeWorkers())
 
+    @property
+    def parallel(self):
+        """Number of workers that can take inputs (not parked)."""
+        if self.__elastic is None:
+            return self.__parallel
+        return self.__elastic.active
+
+    @property
+    def loadAverage(self):
+        """Condition of the load average, to set its warning and limit."""
+        return self.__loadAverage
+
+    @property
+    def memoryPercent(self):
+        """Condition of the memory use, to set its warning and limit."""
+        return self.__memoryPercent
+
+    @property
+    def failure(self):
+        """
+        Exception that has stopped the Pool before processing its input
+        (like a chunk that doesn't fit in a ring), None otherwise.
+        """
+        return self.__failure
+
     @property
     def output(self):
+        """List of the [argin, argout] pairs collected (when not streamed)"""
         return self.__collected
 
+    @property
+    def chunksize(self):
+        """Number of elements in the chunks being fed."""
+        return self.__chunksize.value
+
+    @property
+    def inputLength(self):
+        """Number of inputs, None while the input is not exhausted."""
+        return self.__inputNelements
+
     @property
     def progress(self):
-        pending = self.__input.qsize()
-        nCollected = len(self.__collected)
-        self.debug("%d collected elements from %d inputs "
-                   "(%d to be taken by %d workers)"
-                   % (nCollected, self.__inputNelements, pending,
-                      self.activeWorkers))
+        """
+        Ratio of collected outputs over the number of inputs. While the input
+        iterator is not exhausted the total is unknown and None is returned.
+        """
+        nCollected = self.__nCollected
+        if self.__inputNelements is None:
+            return None
+        if self.__inputNelements == 0:
+            return 1.0
         progress = float(nCollected)/self.__inputNelements
         return progress
 
@@ -179,42 +562,58 @@ class Pool(_Logger):
             except Exception as e:
                 self.error("Cannot get the state of %s" % (worker))
                 states.append(None)
-        self.debug("Checked states: %s" % states)
         return states
 
     @property
     def contributions(self):
-        contributions = []
-        for worker in self.__workersLst:
-            try:
-                contributions.append(worker.contribution)
-            except Exception as e:
-                self.error("Cannot get the contribution of %s" % (worker))
-                contributions.append(None)
-        self.debug("Checked contributions: %s" % contributions)
-        return contributions
+        """Number of inputs processed by each worker."""
+        return [int(row[_TASKS]) for row in self.__stats.snapshot()]
 
     @property
     def computation(self):
-        ts = []
-        tg = 0.0
-        for worker in self.__workersLst:
-            try:
-                tw = worker.computation
-                ts.append(_timedelta(seconds=tw))
-                tg += tw
-            except Exception as e:
-                self.error("Cannot get the computation of %s" % (worker))
-                ts.append(None)
-        t0 = self.__events.whenStarted()
-        t_diff = _datetime.now()-t0
-        tg = _timedelta(seconds=tg)
-        ratio = tg.total_seconds()/t_diff.total_seconds()
-        self.debug("Since %s (%s ago) %s of parallel computations (x%.2f)"
-                   "(reported by workers) distributed in [%s]"
-                   % (t0, t_diff, tg, ratio,
-                      "".join("%s, " % i for i in ts)[:-2]))
-        return tg, ts
+        """
+        Pair with the time used by the target in all the workers and a list
+        with the one of each worker (as timedeltas).
+        """
+        ts = [row[_BUSY] for row in self.__stats.snapshot()]
+        return _timedelta(seconds=sum(ts)), \
+            [_timedelta(seconds=t) for t in ts]
+
+    def stats(self, rows=None):
+        """
+            Snapshot of the counters of the workers, taken at once from the
+            shared memory where they write them. A dictionary with the
+            totals and, in 'workers', one with the ones of each worker:
+            - tasks: inputs processed.
+            - busy: seconds used by the target.
+            - running: seconds that the target has been with the current
+              input (None when it is not with any).
+            - bytesIn, bytesOut: bytes of what the worker has received and
+              sent (only when the transport tells them: the ring for the
+              inputs, any with processes for the outputs).
+            The totals also have the collected outputs, the number of
+            inputs (None until the input is exhausted) and the seconds
+            since the start.
+        """
+        rows = rows or self.__stats.snapshot()
+        now = _time()
+        workers = []
+        for row in rows:
+            started = row[_STARTED]
+            workers.append({'tasks': int(row[_TASKS]), 'busy': row[_BUSY],
+                            'running': now-started if started else None,
+                            'bytesIn': int(row[_BYTESIN]),
+                            'bytesOut': int(row[_BYTESOUT])})
+        started = self.__events.whenStarted()
+        return {'tasks': sum(w['tasks'] for w in workers),
+                'busy': sum(w['busy'] for w in workers),
+                'bytesIn': sum(w['bytesIn'] for w in workers),
+                'bytesOut': sum(w['bytesOut'] for w in workers),
+                'collected': self.__nCollected,
+                'inputs': self.__inputNelements,
+                'elapsed': None if started is None
+                else (_datetime.now()-started).total_seconds(),
+                'workers': workers}
 
     # internal characteristics ---
 
@@ -229,33 +628,267 @@ class Pool(_Logger):
         self.__parallel = parallel
         self.info("Will use %d workers" % (self.__parallel))
 
-    def __prepareInputQueue(self, lst):
-        for element in lst:
-            self.__input.put(element)
-        self.__inputNelements = len(lst)
-        if self.__inputNelements > 10:
-            head = "%s" % lst[:5]
-            tail = "%s" % lst[-5:]
-            lstStr = "%s (...) %s" % (head[:-1], tail[1:])
+    def __prepareTracer(self):
+        names = ["Worker%d" % (i) for i in range(self.__parallel)]
+        self.__tracer = _tracer.Tracer(names+["Pool"])
+        # the pool track is written by many threads
+        self.__trace = self.__tracer.track(self.__parallel, _Lock())
+
+    def __prepareQueues(self, arginLst, *args, **kwargs):
+        if self.__backend == _THREADS:
+            # bounded as a pipe is, to stop the workers when not collected
+            self.__output = _LocalQueue(2*self.__parallel)
+        elif self.__transport == _RING:
+            self.__output = _RingSet(self.__parallel, self.__ringSize,
+                                     fanIn=True)
         else:
-            lstStr = "%s" % (lst)
-        self.debug("input: %s (%d)" % (lstStr, self.__inputNelements))
+            # outputs are in the pipe once put, even if the worker dies
+            self.__output = _PipeQueue()
+        if self.__scheduler == _STEALING:
+            tasks = list(arginLst)
+            self.__inputNelements = self.__inputFed = len(tasks)
+            self.__input = _WorkStealing(tasks, self.__parallel,
+                                         self.__chunksize.value,
+                                         *args, **kwargs)
+            self._instances.append(self.__input)
+            return
+        if self.__highWaterMark is None:
+            if self.__transport == _RING:
+                self.__highWaterMark = _RINGHIGHWATERMARK*self.__parallel
+            elif self.__chunksize.auto:
+                # a small backlog, as the size of the chunks evolves
+                self.__highWaterMark = _AUTOHIGHWATERMARK*self.__parallel
+            else:
+                self.__highWaterMark = _HIGHWATERMARK
+        if self.__backend == _THREADS:
+            self.__input = _LocalQueue(self.__highWaterMark)
+        elif self.__transport == _RING:
+            # what waits in the ring of a worker can't go to another one
+            depth = max(1, self.__highWaterMark//self.__parallel)
+            self.__input = _RingSet(self.__parallel, self.__ringSize,
+                                    fanIn=False, depth=depth)
+        else:
+            self.__input = _Queue(self.__highWaterMark)
+            self.__pickledInput = True
+
+    def __prepareInputQueue(self, iterable):
+        self.__feeder = _Thread(target=self.__feederThread,
+                                args=(iter(iterable),))
+        self.__feeder.setDaemon(True)
+        self.__feeder.start()
+        self.debug("input: %s (feeding up to %d elements in advance)"
+                   % (type(iterable).__name__, self.__highWaterMark))
+
+    def __feederThread(self, iterator):
+        _current_thread().name = "Feeder"
+        try:
+            for chunk in self.__chunks(iterator):
+                if not self.__feed(chunk):
+                    self.info("Feeder interrupted after %d elements"
+                              % (self.__inputFed))
+                    break
+                self.__inputFed += len(chunk)
+            else:
+                self.__inputNelements = self.__inputFed
+                self.debug("input exhausted with %d elements"
+                           % (self.__inputNelements))
+        except Exception as e:  # like a chunk that doesn't fit in the ring
+            self.error("The input cannot be given to the workers after %d "
+                       "elements, STOP the Pool: %s" % (self.__inputFed, e))
+            self.__failure = e
+            self.stop()
+        finally:
+            # one end mark per worker, even when stopped, so none of them
+            # stays blocked waiting for an input that will never come
+            for i in range(self.__parallel):
+                if not self.__put(_EndOfInput(), i):
+                    try:
+                        self.__inputOf(i).put_nowait(_EndOfInput())
+                    except _Full:
+                        pass
+            self.debug("Feeder has finished its task")
+
+    def __feed(self, chunk):
+        """
+            Put the chunk in the input, with the argins that cannot be
+            serialized replaced by a TaskError (the workers give it as the
+            output). False when the Pool is stopped meanwhile.
+        """
+        idx = self.__inputFed
+        self.__inFlight[idx] = chunk
+        try:
+            return self.__put(self.__packed(idx, chunk))
+        except Exception as e:
+            serializable = self.__serializable(chunk)
+            if serializable is None:
+                raise e
+            self.warning("The chunk %d cannot be serialized (%s), its "
+                         "argins that fail are given as errors" % (idx, e))
+            self.__inFlight[idx] = serializable
+            return self.__put(self.__packed(idx, serializable))
+
+    def __packed(self, idx, chunk):
+        """
+            Input element with the chunk. For the multiprocessing Queue it is
+            pickled here, as its thread only prints what it cannot pickle and
+            the chunk would be lost.
+        """
+        element = (idx, chunk, _time())
+        if self.__pickledInput:
+            return _dumps(element, _HIGHEST_PROTOCOL)
+        return element
+
+    def __serializable(self, chunk):
+        """
+            Copy of the chunk with a TaskError instead of each argin that
+            cannot be pickled, or None when all of them can.
+        """
+        argins, failed = [], False
+        for argin in chunk:
+            try:
+                _dumps(argin, _HIGHEST_PROTOCOL)
+            except Exception as e:
+                argin = _TaskError.fromException(repr(_unwrap(argin)[0]), e)
+                failed = True
+            argins.append(argin)
+        return argins if failed else None
+
+    def __chunks(self, iterator):
+        chunk = []
+        for element in iterator:
+            chunk.append(element)
+            if len(chunk) >= self.__chunksize.value:
+                yield chunk
+                chunk = []
+                if self.__chunksize.auto:
+                    self.__reviewChunksize()
+        if len(chunk) > 0:
+            yield chunk
+
+    def histograms(self, rows=None):
+        """
+            Histograms of the seconds that the chunks have waited in the
+            input ('wait'), of each call to the target ('execution'), both
+            merged from the ones of the workers, and that the outputs have
+            traveled to the collector ('transit'). Each one is the list of
+            the counts in the buckets of yamp.stats.bounds() and the sum of
+            the seconds at the end.
+        """
+        rows = rows or self.__stats.snapshot()
+        return {'wait': _merge(rows, _WAIT),
+                'execution': _merge(rows, _EXECUTION),
+                'transit': list(self.__transit)}
+
+    def latencies(self):
+        """
+            Number of observations, mean and percentiles 50, 90 and 99 (the
+            upper bound of their bucket, in seconds) of each histogram.
+        """
+        latencies = {}
+        for name, histogram in self.histograms().items():
+            n = _count(histogram)
+            latencies[name] = {'count': n,
+                               'mean': histogram[-1]/n if n else None,
+                               'p50': _quantile(histogram, 0.50),
+                               'p90': _quantile(histogram, 0.90),
+                               'p99': _quantile(histogram, 0.99)}
+        return latencies
+
+    def throughput(self):
+        """
+            List of (time, outputs collected per second) between the reviews
+            of the Pool (one per second), for the last hour.
+        """
+        samples = list(self.__throughput)
+        return [(t1, (n1-n0)/(t1-t0))
+                for (t0, n0), (t1, n1) in zip(samples, samples[1:])]
+
+    def metrics(self, labels=None):
+        """
+            The stats(), the histograms() and the last throughput in the
+            text format of Prometheus. The labels, a dictionary, are added
+            to all the samples (to tell apart many Pools).
+        """
+        rows = self.__stats.snapshot()
+        throughput = self.throughput()
+        return _metrics.text(self.stats(rows), self.histograms(rows),
+                             throughput[-1][1] if throughput else None,
+                             labels)
+
+    def exportMetrics(self, fileName, labels=None):
+        """Write the metrics() in a file, replacing it at once."""
+        _metrics.write(fileName, self.metrics(labels))
+
+    def serveMetrics(self, port, address='127.0.0.1', labels=None):
+        """
+            Answer the metrics() by HTTP in this port (0 for any free one)
+            from a daemon thread. Return the MetricsServer, to close() it.
+        """
+        return _metrics.MetricsServer(lambda: self.metrics(labels), port,
+                                      address)
+
+    def __reviewChunksize(self):
+        rows = self.__stats.snapshot()
+        self.__chunksize.review(sum(row[_TASKS] for row in rows),
+                                sum(row[_BUSY] for row in rows))
+
+    def __inputOf(self, id):
+        """Input queue as seen by the worker id."""
+        if self.__scheduler == _STEALING:
+            return self.__input.queue(id)
+        if self.__transport == _RING:
+            return self.__input.ring(id)
+        return self.__input
+
+    def __outputOf(self, id):
+        """Output queue as seen by the worker id."""
+        if self.__transport == _RING:
+            return self.__output.ring(id)
+        return self.__output
+
+    def __put(self, element, id=None):
+        """
+            Blocking put in the input queue (or in the one of the worker id)
+            that gives up when the Pool is stopped.
+        """
+        queue = self.__input if id is None else self.__inputOf(id)
+        while not self.__events.isStopped():
+            try:
+                queue.put(element, True, self.checkPeriod)
+                return True
+            except _Full:
+                pass
+        return False
 
     def __prepareWorkers(self, *args, **kwargs):
+        self.__stats = _Stats(self.__parallel)
         for i in range(self.__parallel):
             newWorker = self.__buildWorker(i, *args, **kwargs)
             self.__appendWorker(newWorker)
             self._instances.append(newWorker)
-            _sleep(0.1)  # to give space to the worker monitor thread
         self.debug("%d workers ready" % (self.activeWorkers))
 
     def __buildWorker(self, id, *args, **kwargs):
-        worker = _Worker(id, self.__target, self.__input, self.__output,
+        worker = _Worker(id, self.__target, self.__inputOf(id),
+                         self.__outputOf(id),
                          checkPeriod=self.checkPeriod,
                          preHook=self.__preHook,
                          preExtraArgs=self.__preExtraArgs,
                          postHook=self.__postHook,
-                         postExtraArgs=self.__postExtraArgs, *args, **kwargs)
+                         postExtraArgs=self.__postExtraArgs,
+                         chunksize=self.__chunksize.value,
+                         maxTasks=self.__maxTasks, maxRss=self.__maxRss,
+                         timeout=self.__timeout,
+                         retryPolicy=self.__retryPolicy,
+                         cooperative=self.__pauseMode == _COOPERATIVE,
+                         events=self.__events, backend=self.__backend,
+                         concurrency=self.__concurrency,
+                         stats=self.__stats.row(id),
+                         trace=None if self.__tracer is None
+                         else self.__tracer.track(id),
+                         profile=self.__profile,
+                         profileFolder=self.__profileFolder,
+                         *args, **kwargs)
         while not worker.prepared():
             self.debug("Worker%d not yet prepared, wait" % (id))
             worker.waitPrepared(1)
@@ -266,62 +899,454 @@ class Pool(_Logger):
 
     def __prepareMonitoring(self):
         self.__poolMonitor.start()
+        self.__supervisor.start()
+
+    def __stream(self):
+        """Generator of the (index, pairs) chunks as they are collected."""
+        if self.__events.isStarted():
+            raise AssertionError("Outputs can only be streamed from a Pool "
+                                 "not yet started")
+        # bounded, so a slow consumer stops the collection and then the
+        # workers, instead of accumulating what they produce
+        self.__results = _LocalQueue(2*self.__parallel)
+        self.start()
+        finished = False
+        try:
+            while True:
+                chunk = self.__results.get()
+                if chunk is _ENDOFRESULTS:
+                    finished = True
+                    break
+                yield chunk
+        finally:
+            if not finished:  # the consumer has given up (GeneratorExit)
+                self.__abandoned = True
+                self.stop()
+        if self.__failure is not None:
+            raise self.__failure
 
     def __poolMonitorThread(self):
+        try:
+            self.__poolMonitorProcedure()
+        finally:
+            self.__profiled.set()  # even if it has not been merged
+            if self.__results is not None:
+                self.__streamResults(_ENDOFRESULTS)
+
+    def __poolMonitorProcedure(self):
         _current_thread().name = "PoolMonitor"
-        while not self.__events.waitStart(self.checkPeriod):
-            self.debug("Collector prepared, but processing not started")
-            # FIXME: msg to be removed, together with the timeout
+        self.__events.waitStart()
         while not self.__events.isStopped():
-            if self.__events.waitStep(self.checkPeriod):
-                self.__events.stepClean()
-                self.debug("STEP event received")
-                self.__collectOutputs()
-            else:
-                self.debug("Periodic check")
-            self.__reviewWorkers()
-            self.__loadAverage.review()
-            self.__memoryPercent.review()
-        while self.activeWorkers > 0:
+            self.__collectOutputs(_REVIEWPERIOD)
+            self.__review()
+        while self.__workersPending():
             self.debug("Waiting workers to finish")
-            self.__reviewWorkers()
-            if self.activeWorkers > 0:
-                _sleep(self.checkPeriod)
+            self.__collectOutputs(_REVIEWPERIOD)
+        self.__collectOutputs()  # what the last ones may have left
+        self.__throughput.append((_time(), self.__nCollected))
+        # the conditions may be shared with other Pools that go on
+        self.__loadAverage._release(self.__events)
+        self.__memoryPercent._release(self.__events)
+        if self.__profileFolder is not None:
+            self.__collectProfiles()
+        if self.__traceFile is not None:
+            try:
+                self.dumpTrace(self.__traceFile)
+            except Exception as e:
+                self.error("Cannot write the trace in %s: %s"
+                           % (self.__traceFile, e))
         self.debug("Pool complete, exiting")
 
-    def __collectOutputs(self):
-        while not self.__output.empty():
-            collected = 0
-            while not self.__output.empty():
-                data = self.__output.get()
-                collected += 1
-                self.__collected.append(data)
-            self.debug("collect %d outputs" % (collected))
-            if self.logEnable:
-                self.progress
-                self.contributions
-                self.computation
-        if len(self.__collected) == self.__inputNelements:
-            self.info("All %d inputs processed and collected"
-                      % (self.__inputNelements))
+    def __collectProfiles(self):
+        """
+            Merge the profiles, as the workers write them before reporting
+            their end, and remove their files.
+        """
+        try:
+            self.__profileReport = self.__mergeProfiles()
+            self.info("Profile of the workers:\n%s"
+                      % (self.__profileReport.text(10)))
+        except Exception as e:
+            self.error("Cannot merge the profiles: %s" % (e))
+            self.__profileReport = _profiler.Report(
+                [], self.__workersLst[0].profileParts)
+        finally:
+            _rmtree(self.__profileFolder, ignore_errors=True)
+            self.__profiled.set()
+
+    def __review(self):
+        """Periodic review of the conditions."""
+        if _time()-self.__lastReview < _REVIEWPERIOD:
+            return
+        self.__lastReview = _time()
+        self.__throughput.append((self.__lastReview, self.__nCollected))
+        self.__loadAverage.review()
+        self.__memoryPercent.review()
+        if self.__elastic is not None:
+            self.__reviewParallelism()
+
+    def __reviewParallelism(self):
+        """Park or unpark workers following the pressure of conditions."""
+        if self.__inputExhausted():
+            # no need to spare resources for an input that will not come
+            active = self.__elastic.release()
+        else:
+            pressures = [self.__loadAverage.pressure(),
+                         self.__memoryPercent.pressure()]
+            if _PRESSED in pressures:
+                pressure = _PRESSED
+            elif _STEADY in pressures:
+                pressure = _STEADY
+            else:
+                pressure = _RELIEVED
+            active = self.__elastic.review(pressure)
+        for worker in self.__workersLst:
+            if worker.id < active:
+                worker._unpark()
+            else:
+                worker._park()
+            if self.__transport == _RING and self.__scheduler == _QUEUE:
+                self.__input.enable(worker.id, worker.id < active)
+
+    def __inputExhausted(self):
+        """All the inputs have been taken, at most the end marks remain."""
+        if self.__scheduler == _STEALING:
+            return self.__input.empty()
+        if self.__inputNelements is None:
+            return False
+        if self.__transport == _RING:
+            # the work left in the rings of the active workers (what is in
+            # the ring of a parked one waits for it), at most the end marks
+            active = self.__elastic.active
+            return sum(self.__input.ring(id).qsize()
+                       for id in range(active)) <= active
+        return self.__input.qsize() <= self.__parallel
+
+    def __workersPending(self):
+        for worker in self.__workersLst:
+            if worker.id in self.__respawning and \
+                    not self.__events.isStopped():
+                return True
+            if worker.id in self.__workersEnded:
+                continue
+            if worker.isAlive():
+                return True
+            # the supervisor will respawn it
+            if worker._crashed() and not self.__events.isStopped():
+                return True
+        return False
+
+    def __collectOutputs(self, timeout=None):
+        """
+            Block on the output until something comes (or the timeout) and
+            then collect all that is already there.
+        """
+        collected = 0
+        try:
+            element = self.__output.get(timeout is not None, timeout)
+            t_0 = _time()
+            while True:
+                if isinstance(element, _WorkerEnd):
+                    self.debug("Worker %d has finished", element.id)
+                    self.__workersEnded.add(element.id)
+                else:
+                    if len(element) > 2:
+                        _observe(self.__transit, _time()-element[2])
+                    collected += self.__collectChunk(element[0], element[1])
+                element = self.__output.get_nowait()
+        except _Empty:
+            pass
+        if collected > 0:
+            if self.__trace is not None:
+                self.__trace.record(_tracer.COLLECT, t_0, _time(), collected)
+            self.debug("collect %d outputs", collected)
+            if self.isEnabledFor(self.DEBUG):
+                self.__logStats()
+        if self.__inputNelements is not None and \
+                self.__nCollected == self.__inputNelements:
+            if not self.__events.isStopped():
+                self.info("All %d inputs processed and collected"
+                          % (self.__inputNelements))
+                self.stop()
+        elif not self.__workersPending() and \
+                not self.__events.isStopped() and not self.__requeueLost():
+            self.info("All workers have finished")
             self.stop()
 
-    def __reviewWorkers(self):
-        for i, worker in enumerate(self.__workersLst):
-            if not worker.isAlive():
-                if self.progress > 100:
-                    self.warning("Worker %s is not alive! Rebuild it"
-                                 % (worker.id))
-                    self.__workersLst[i] = self.__buildWorker(i)
+    def __collectChunk(self, idx, pairs):
+        """Take the outputs of a chunk, unless it is a repetition."""
+        if not self.__takeChunk(idx):
+            self.warning("Chunk %d already collected, discard the "
+                         "repetition" % (idx))
+            return 0
+        self.__nCollected += len(pairs)
+        if self.__results is None:
+            self.__collected.extend(pairs)
+        else:
+            self.__streamResults((idx, pairs))
+        return len(pairs)
+
+    def __requeueLost(self):
+        """
+            When all the workers have finished, the chunks still in flight
+            are the ones that a worker has taken and died before telling it.
+            Put them again in the input, with the end marks, and ask the
+            supervisor to respawn the workers. Return if there were any.
+            The ones lost too many times are collected here, as errors.
+        """
+        if self.__feeder is None or self.__inputNelements is None:
+            return False
+        with self.__inFlightLock:
+            lost = sorted(self.__inFlight.items())
+        if len(lost) == 0:
+            return False
+        self.warning("%d chunks taken by workers that have died are lost, "
+                     "give them again" % (len(lost)))
+        requeued = 0
+        for idx, argins in lost:
+            times = self.__losses.get(idx, 0)+1
+            self.__losses[idx] = times
+            if times > self.__maxCrashes:
+                self.error("The chunk %d has been lost %d times, giving up"
+                           % (idx, times))
+                # not given again: what is lost may be what can't travel
+                pairs = []
+                for argin in argins:
+                    if isinstance(argin, (_TaskTimeout, _TaskError)):
+                        pairs.append([argin.argin, argin])
+                        continue
+                    argin = _unwrap(argin)[0]
+                    pairs.append([argin, _TaskError(
+                        argin, "WorkerDied", "lost by the workers that took "
+                        "it", attempts=times)])
+                self.__collectChunk(idx, pairs)
+                continue
+            if not self.__put((idx, argins, _time())):
+                return True  # stopped meanwhile
+            requeued += 1
+        if requeued == 0:
+            return False
+        for i in range(self.__parallel):
+            self.__put(_EndOfInput(), i)
+        ids = [worker.id for worker in self.__workersLst]
+        self.__respawning.update(ids)
+        self.__workersEnded.difference_update(ids)
+        return True
+
+    def __streamResults(self, chunk):
+        """
+            Put the chunk for the consumer of the stream, waiting while it
+            has enough (but reviewing the conditions meanwhile).
+        """
+        while not self.__abandoned:
+            try:
+                self.__results.put(chunk, True, _REVIEWPERIOD)
+                return
+            except _Full:
+                self.__review()
+
+    def __logStats(self):
+        stats = self.stats()
+        self.debug("%d collected elements from %s inputs (%d fed)",
+                   stats['collected'], stats['inputs'], self.__inputFed)
+        self.debug("Contributions: %s",
+                   [w['tasks'] for w in stats['workers']])
+        if stats['elapsed']:
+            self.debug("%s of parallel computations in %s (x%.2f) "
+                       "(reported by workers) distributed in [%s]",
+                       _timedelta(seconds=stats['busy']),
+                       _timedelta(seconds=stats['elapsed']),
+                       stats['busy']/stats['elapsed'],
+                       ", ".join("%s" % _timedelta(seconds=w['busy'])
+                                 for w in stats['workers']))
+
+    def __takeChunk(self, idx):
+        """Mark a chunk as collected, False if it already was."""
+        with self.__inFlightLock:
+            if self.__scheduler == _STEALING:
+                if idx in self.__collectedIdx:
+                    return False
+                self.__collectedIdx.add(idx)
+                self.__inFlight.pop(idx, None)
+                return True
+            return self.__inFlight.pop(idx, None) is not None
+
+    def __recoverChunk(self, holding, expired=False, exitcode=None):
+        """
+            Chunk (idx, argins) that a dead worker was processing, if it is
+            not collected. The argin in process is retried, or replaced by a
+            TaskTimeout when it had exceeded its deadline too many times, or
+            by a TaskError when it has killed too many workers (when there is
+            an exitcode, as the cause of the death).
+        """
+        idx, length, position = holding
+        with self.__inFlightLock:
+            if self.__scheduler == _STEALING:
+                if idx in self.__collectedIdx:
+                    return None
+                # only the recovered ones, that may have been modified
+                argins = self.__inFlight.get(idx) or \
+                    self.__input.chunk(idx, length)
+            else:
+                argins = self.__inFlight.get(idx)
+                if argins is None:
+                    return None
+            if expired:
+                argins = self.__expireArgin(idx, argins, position)
+            elif exitcode is not None:
+                argins = self.__crashArgin(idx, argins, position, exitcode)
+            self.__inFlight[idx] = argins
+        return idx, argins
+
+    def __crashArgin(self, idx, argins, position, exitcode):
+        times = self.__crashes.get((idx, position), 0)+1
+        self.__crashes[(idx, position)] = times
+        argin, timeout = _unwrap(argins[position])
+        if times <= self.__maxCrashes:
+            self.warning("%r has killed its worker (%d times), retry"
+                         % (argin, times))
+            return argins
+        self.error("%r has killed its worker (%d times), giving up"
+                   % (argin, times))
+        argins = list(argins)
+        argins[position] = _TaskError(argin, "WorkerDied", "the process "
+                                      "died with exitcode %s" % (exitcode),
+                                      attempts=times)
+        return argins
+
+    def __expireArgin(self, idx, argins, position):
+        times = self.__timeouts.get((idx, position), 0)+1
+        self.__timeouts[(idx, position)] = times
+        argin, timeout = _unwrap(argins[position], self.__timeout)
+        if times <= self.__timeoutRetries:
+            self.warning("%r has exceeded its timeout (%d times), retry"
+                         % (argin, times))
+            return argins
+        self.warning("%r has exceeded its timeout (%d times), giving up"
+                     % (argin, times))
+        argins = list(argins)
+        argins[position] = _TaskTimeout(argin, timeout)
+        return argins
+
+    def __supervisorThread(self):
+        """
+            Single thread watching all the worker processes: it waits for any
+            of them to end or for a change in the events, to suspend or
+            resume the whole fleet, and joins them (or replaces the ones that
+            retire, or die while the Pool is running). It also kills the
+            ones whose target exceeds its deadline.
+        """
+        _current_thread().name = "Supervisor"
+        suspended = False
+        watched = list(self.__workersLst)
+        # the collector may ask for the workers again, until the stop
+        while len(watched) > 0 or not self.__events.isStopped():
+            self.__waitChanges(watched)
+            self.__events.clearNotifications()
+            for worker in self.__workersLst:
+                if worker.id in self.__respawning and \
+                        not worker.isAlive():
+                    self.__respawnWorker(worker, suspended)
+                    self.__respawning.discard(worker.id)
+                    if worker not in watched:
+                        watched.append(worker)
+            for worker in watched[:]:
+                if worker._mustRespawn():
+                    self.__respawnWorker(worker, suspended)
+                elif worker.retired or worker.isAlive():
+                    continue
+                elif worker._crashed() and not self.__events.isStopped():
+                    self.__recoverWorker(worker, suspended)
+                else:
+                    watched.remove(worker)
+                    worker._join()
+                    if worker.exitcode != 0:
+                        self.warning("Worker %d has died (exitcode %s)"
+                                     % (worker.id, worker.exitcode))
+                    else:
+                        self.debug("Worker %d joined" % (worker.id))
+            # a suspended process wouldn't see the stop
+            pause = self.__pauseMode == _SUSPEND and \
+                self.__events.isPaused() and not self.__events.isStopped()
+            if pause != suspended:
+                self.__suspendWorkers(watched, pause)
+                suspended = pause
+                if suspended:
+                    t_suspended = _time()
+                elif self.__trace is not None:
+                    self.__trace.record(_tracer.SUSPENDED, t_suspended,
+                                        _time())
+            if not suspended and self.__backend == _PROCESSES:
+                self.__checkDeadlines(watched)
+        self.debug("Supervisor has finished its task")
+
+    def __checkDeadlines(self, workers):
+        now = _time()
+        for worker in workers:
+            if worker.id in self.__expired:
+                continue  # already killed
+            expired = worker._expired(now)
+            if expired is not None:
+                self.warning("Worker %d has exceeded the deadline of the "
+                             "input %d in the chunk %d"
+                             % (worker.id, expired[1], expired[0]))
+                if worker._kill(expired):
+                    self.__expired[worker.id] = expired
+                    self.__instant(_tracer.KILL, worker.id)
+
+    def __recoverWorker(self, worker, suspended):
+        holding = worker.holding
+        expired = self.__expired.pop(worker.id, None)
+        recovered = None
+        if holding is None:
+            pass
+        elif expired is None:
+            recovered = self.__recoverChunk(holding, exitcode=worker.exitcode)
+        elif expired == (holding[0], holding[2]):
+            recovered = self.__recoverChunk(holding, expired=True)
+        else:
+            # killed just when passing to another argin
+            recovered = self.__recoverChunk(holding)
+        if recovered is None:
+            self.warning("Worker %d has died (exitcode %s), respawning"
+                         % (worker.id, worker.exitcode))
+        else:
+            self.warning("Worker %d has died (exitcode %s), respawning with "
+                         "the chunk %d" % (worker.id, worker.exitcode,
+                                           recovered[0]))
+        self.__respawnWorker(worker, suspended, recovered)
+
+    def __respawnWorker(self, worker, suspended, recovered=None):
+        try:
+            self.__instant(_tracer.RESPAWN, worker.id)
+            worker._respawn(recovered)
+            if suspended:
+                worker._suspend()
+        except Exception as e:
+            self.error("Cannot respawn %s: %s" % (worker, e))
+
+    def __instant(self, kind, argument=-1):
+        if self.__trace is not None:
+            self.__trace.instant(kind, argument)
+
+    def __waitChanges(self, workers):
+        sentinels = [worker.sentinel for worker in workers]
+        if _wait is None or None in sentinels:
+            self.__events.notifier.poll(_POLLPERIOD)
+        else:
+            _wait(sentinels+[self.__events.notifier], _DEADLINEPERIOD)
+
+    def __suspendWorkers(self, workers, suspend):
+        done = True
+        for worker in workers:
+            try:
+                if suspend:
+                    done = worker._suspend() and done
                 else:
-                    self.info("pop %s from the workers list" % (worker))
-                    self.__workersLst.pop(i)
-#             elif self.__events.isStarted() and\
-#                     not worker.isStarted() and\
-#                     not worker._endProcedure():
-#                 self.warning("Worker %d hasn't start when it should have "
-#                              "(event: %s, worker: %s)"
-#                              % (i, self.__events.isStarted(),
-#                                 worker.isStarted()))
-        if self.activeWorkers == 0:
-            self.__events.stop()
+                    done = worker._resume() and done
+            except Exception as e:
+                self.error("Cannot %s %s: %s"
+                           % ("suspend" if suspend else "resume", worker, e))
+        if suspend and not done:
+            self.warning("Without psutil pause will be when the processes "
+                         "finish their current task.")